@@ -4,14 +4,25 @@ import os
 import sys
 import json
 import signal
+import hashlib
 from pathlib import Path
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 from subprocess import Popen, PIPE
 
-from fastapi import FastAPI, Query, HTTPException, status, Body
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Query, HTTPException, status, Body, Header, Depends
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, conlist
-from vehicle_view import view as car_view_func
+from vehicle_view import (
+    view_async as car_view_func, stock_id_from_url, ViewCache, close_async_client,
+    view_batch, host_limiter,
+)
+from lot_store import GenerationCache, LotStore, SqliteLotStore
+from log_tail import tail_lines, follow_lines
+from parser.progress import (
+    read_status, pid_alive, ACTIVE_STATES, PARSE_SECONDS_BUCKETS, ITEMS_PER_PAGE_BUCKETS,
+)
+from metrics import REGISTRY, CONTENT_TYPE, Family, RequestMetricsMiddleware, histogram_samples
 from fastapi.responses import JSONResponse
 
 
@@ -21,6 +32,27 @@ DATA_DIR = BASE_DIR / "JSONs"
 LOG_DIR  = BASE_DIR / "parser" / "logs"
 PROJECT_ROOT = Path(__file__).parent.resolve()
 SECTIONS_PATH = PROJECT_ROOT / "parser" / "sections.json"
+RELOAD_INTERVAL = 5.0  # как часто (сек) проверять JSONs/*_lots.json на изменения
+# где держать лоты: "memory" — в памяти процесса, "sqlite" — в LOTS_DB_PATH
+LOT_BACKEND = os.environ.get("LOT_BACKEND", "memory")
+LOTS_DB_PATH = BASE_DIR / "lots.sqlite3"
+SNAPSHOT_DIR = BASE_DIR / ".lot_cache"  # бинарные снимки разобранных *_lots.json
+LOAD_WORKERS = os.cpu_count() or 1      # процессов для разбора JSON при старте
+PAGE_CACHE_SIZE = 512  # сколько готовых тел страниц /cars держать в LRU
+EXPORT_BATCH = 1000    # по сколько лотов выгрузка /cars/export берёт из хранилища
+VIEW_CACHE_TTL = 300.0     # сек, сколько карточка /car/view считается свежей
+VIEW_CACHE_STALE = 1800.0  # сек после TTL, когда отдаём старую и обновляем в фоне
+VIEW_CACHE_SIZE = 2000     # максимум карточек в кеше
+VIEW_RATE_PER_HOST = 10.0  # запросов/сек к одному хосту iaai через прокси
+VIEW_RATE_BURST = 10       # допустимый всплеск сверх средней частоты
+BATCH_MAX_ITEMS = 5000        # лотов в одном /car/view/batch
+BATCH_DEFAULT_CONCURRENCY = 8
+BATCH_MAX_CONCURRENCY = 32
+BATCH_ITEM_TIMEOUT = 60.0     # сек на один лот в пакете
+LOG_TAIL_DEFAULT = 100        # строк в /admin/logs/{name}/tail по умолчанию
+LOG_TAIL_MAX = 10000
+LOG_FOLLOW_POLL = 0.5         # сек между проверками лога в режиме follow
+LOG_FOLLOW_HEARTBEAT = 15.0   # сек тишины до SSE-комментария, чтобы соединение не рвали
 
 parser_proc = None
 
@@ -44,39 +76,183 @@ class Car(BaseModel):
     acv: str
     auction_date: str
 
-# Загрузка всех лотов в память
-_all_cars: List[dict] = []
-for fn in os.listdir(DATA_DIR):
-    if fn.endswith("_lots.json"):
-        with open(DATA_DIR / fn, encoding="utf-8") as f:
-            for item in json.load(f):
-                try:    item["lot_id"] = int(item.get("lot_id", 0))
-                except: item["lot_id"] = 0
-                _all_cars.append(item)
-_all_cars.sort(key=lambda x: x["lot_id"])
+# Лоты загружаются при старте и подхватываются фоновым потоком,
+# как только parser.runner перезаписывает файлы секций
+if LOT_BACKEND == "sqlite":
+    lot_store = SqliteLotStore(LOTS_DB_PATH, DATA_DIR, interval=RELOAD_INTERVAL)
+else:
+    lot_store = LotStore(
+        DATA_DIR,
+        interval=RELOAD_INTERVAL,
+        cache_dir=SNAPSHOT_DIR,
+        workers=LOAD_WORKERS
+    )
+
+# закодированные тела страниц /cars; сбрасываются при смене поколения лотов
+page_cache = GenerationCache(maxsize=PAGE_CACHE_SIZE)
+
+# карточки лотов: запросы одного stock_id не ходят через прокси повторно
+view_cache = ViewCache(
+    car_view_func,
+    ttl=VIEW_CACHE_TTL,
+    stale_ttl=VIEW_CACHE_STALE,
+    maxsize=VIEW_CACHE_SIZE
+)
+host_limiter.configure(VIEW_RATE_PER_HOST, VIEW_RATE_BURST)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lot_store.refresh()
+    lot_store.start()
+    yield
+    lot_store.stop()
+    await close_async_client()
 
 app = FastAPI(
     title="IAAI Cars API",
     description="Keyset-pagination + управление парсером и логами",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 # Глобальная переменная для хранения процесса парсинга
 parser_proc: Optional[Popen] = None
 
-@app.get("/cars", response_model=List[Car])
+def page_etag(version: str, key: tuple) -> str:
+    digest = hashlib.blake2b(repr((version, key)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def car_filters(
+    damage: Optional[str] = Query(None, description="Primary Damage, например Front End"),
+    branch: Optional[str] = Query(None, description="Площадка (Branch)"),
+    fuel_type: Optional[str] = Query(None, description="Тип топлива"),
+    run_and_drive: Optional[str] = Query(None, description="Run & Drive"),
+    key: Optional[str] = Query(None, description="Наличие ключа"),
+    country: Optional[str] = Query(None, description="Страна"),
+) -> dict:
+    """Фильтры по индексированным полям; непереданные отбрасываются."""
+    filters = {
+        "damage": damage,
+        "branch": branch,
+        "fuel_type": fuel_type,
+        "run_and_drive": run_and_drive,
+        "key": key,
+        "country": country,
+    }
+    return {f: v for f, v in filters.items() if v is not None}
+
+@app.get(
+    "/cars",
+    response_model=List[Car],
+    responses={304: {"description": "Страница не изменилась с прошлого запроса"}}
+)
 def list_cars(
     limit: int = Query(100, gt=0, le=1000),
     lastId: int = Query(0, ge=0),
+    filters: dict = Depends(car_filters),
+    if_none_match: Optional[str] = Header(None),
 ):
-    filtered = [c for c in _all_cars if c["lot_id"] > lastId]
-    return filtered[:limit]
+    """
+    Keyset-пагинация по lot_id с фильтрами по индексированным полям.
+    Фильтры сравниваются без учёта регистра, курсор lastId работает
+    поверх отфильтрованной выборки.
+    Ответ несёт ETag; с If-None-Match неизменившаяся страница отдаёт 304.
+    """
+    # ETag, ключ кеша и тело — из одного снимка, даже если перезагрузка идёт прямо сейчас
+    snap = lot_store.snapshot
+    key = (lastId, limit, tuple(sorted(filters.items())))
+    etag = page_etag(snap.version, key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body = page_cache.get(snap.generation, key)
+    if body is None:
+        # лоты закодированы заранее при загрузке — только склеиваем байты;
+        # response_model остаётся ради схемы OpenAPI
+        fragments, _ = lot_store.page_fragments(lastId, limit, filters, snap)
+        body = b"[" + b",".join(fragments) + b"]"
+        page_cache.put(snap.generation, key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def export_chunks(filters: dict):
+    """
+    Отдаёт все лоты по EXPORT_BATCH штук, двигаясь keyset-курсором,
+    поэтому в памяти одновременно только одна пачка.
+    """
+    last_id = 0
+    while True:
+        fragments, last_id = lot_store.page_fragments(last_id, EXPORT_BATCH, filters)
+        if not fragments:
+            break
+        yield b"\n".join(fragments) + b"\n"
+
+@app.get("/cars/export")
+def export_cars(filters: dict = Depends(car_filters)):
+    """
+    Полная выгрузка лотов (с теми же фильтрами, что у /cars)
+    в формате NDJSON — по объекту Car на строку, потоком.
+    """
+    return StreamingResponse(export_chunks(filters), media_type="application/x-ndjson")
+
+@app.get("/cars/stats")
+def cars_stats():
+    """
+    Распределения лотов: по типу повреждений, площадке, топливу и дню
+    аукциона, плюс гистограммы ACV и пробега. Агрегаты поддерживаются
+    при загрузке секций, запрос только собирает ответ из корзин.
+    """
+    snap = lot_store.snapshot
+    return {"generation": snap.generation, **lot_store.stats(snap)}
+
+class SearchPage(BaseModel):
+    items: List[Car]
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Передать в cursor для следующей страницы; null — выдача закончилась"
+    )
+
+@app.get("/cars/search", response_model=SearchPage)
+def search_cars(
+    q: str = Query(..., min_length=1, description="Фрагменты названия, например 2019 BMW X5"),
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущего ответа"),
+):
+    """
+    Поиск по title: сначала лоты, где все слова запроса совпали целиком,
+    затем — где часть слов совпала как подстрока. Внутри уровня — по lot_id.
+    Бэкенд sqlite ранжирования не делает и укладывается в 10 мс только на
+    избирательных словах от трёх символов: на 500 тыс. лотов широкие
+    запросы — 20–30 мс, запрос только из коротких слов (LIKE перебором) —
+    до 0,5 с. Цель < 10 мс держит бэкенд memory.
+    """
+    after = None
+    if cursor:
+        try:
+            tier, last_id = cursor.split(":")
+            after = (int(tier), int(last_id))
+        except ValueError:
+            raise HTTPException(422, f"Invalid cursor: {cursor}")
+
+    items, nxt = lot_store.search(q, limit, after)
+    return {
+        "items": items,
+        "next_cursor": f"{nxt[0]}:{nxt[1]}" if nxt else None,
+    }
 
 @app.post("/admin/run-parser", status_code=status.HTTP_202_ACCEPTED)
 def run_parser():
     global parser_proc
     if parser_proc and parser_proc.poll() is None:
         raise HTTPException(409, "Parser is already running")
+    # парсер, запущенный из CLI или до рестарта API, виден только по статусам
+    if any(sec["state"] in ACTIVE_STATES and pid_alive(sec.get("pid")) for sec in read_status()):
+        raise HTTPException(409, "Parser is already running")
 
     # Убеждаемся, что у нас есть папка parser
     if not (PROJECT_ROOT / "parser").is_dir():
@@ -122,11 +298,71 @@ def stop_parser():
 @app.get("/admin/parser-status", status_code=status.HTTP_200_OK)
 def parser_status():
     """
-    Опциональный endpoint, чтобы узнать, жив ли процесс.
+    Жив ли процесс парсера и прогресс по разделам: страница из pages_total,
+    лоты, рестарты/капчи, pages_per_sec, lots_per_sec и eta_sec.
+    Разделы пишут свои статусы в parser/status/<keyword>.json. Активным
+    раздел считается, пока жив его процесс (pid в статусе): парсер мог быть
+    запущен из CLI или пережить рестарт API.
     """
-    if parser_proc and parser_proc.poll() is None:
-        return {"running": True, "pid": parser_proc.pid}
-    return {"running": False}
+    running = bool(parser_proc and parser_proc.poll() is None)
+    sections = read_status()
+    for sec in sections:
+        if sec["state"] not in ACTIVE_STATES:
+            continue
+        if pid_alive(sec.get("pid")):
+            running = True
+        else:
+            # процесс убит или упал, не успев отчитаться
+            sec["state"] = "stopped"
+            sec["eta_sec"] = None
+    if running and parser_proc and parser_proc.poll() is None:
+        return {"running": True, "pid": parser_proc.pid, "sections": sections}
+    return {"running": running, "sections": sections}
+
+@REGISTRY.register_collector
+def lot_store_metrics():
+    yield Family("lot_store_lots", "gauge", "Лотов в текущем наборе данных",
+                 [("lot_store_lots", (("backend", lot_store.backend),), lot_store.count())])
+    yield Family("lot_store_generation", "gauge", "Поколение набора лотов (растёт при каждой перезагрузке)",
+                 [("lot_store_generation", (("backend", lot_store.backend),), lot_store.generation)])
+
+@REGISTRY.register_collector
+def crawler_metrics():
+    """Счётчики парсера из parser/status/<keyword>.json (пишет parser.runner)."""
+    sections = read_status()
+    counters = (
+        ("crawler_pages_fetched_total", "pages_fetched", "Скачано страниц выдачи"),
+        ("crawler_lots_fetched_total", "lots_fetched", "Получено лотов со страниц"),
+        ("crawler_captchas_total", "captcha_restarts", "Капчи (каждая — перезапуск сессии)"),
+        ("crawler_retries_total", "retries", "Перезапуски раздела после сбоя"),
+        ("crawler_bytes_written_total", "bytes_written", "Байт записано в *_lots.json"),
+    )
+    for name, field, help in counters:
+        yield Family(name, "counter", help,
+                     [(name, (("section", sec["keyword"]),), sec.get(field, 0)) for sec in sections])
+    yield Family("crawler_lots", "gauge", "Лотов в выходном файле раздела",
+                 [("crawler_lots", (("section", sec["keyword"]),), sec.get("lots", 0)) for sec in sections])
+    yield Family("crawler_queue_depth", "gauge", "Страниц в очереди конвейера (fetch — ждут разбора, parse — в разборе)",
+                 [("crawler_queue_depth", (("section", sec["keyword"]), ("stage", stage)), depth)
+                  for sec in sections for stage, depth in (sec.get("queues") or {}).items()])
+    histograms = (
+        ("crawler_page_parse_seconds", "parse_seconds", PARSE_SECONDS_BUCKETS, "Разбор одной страницы выдачи"),
+        ("crawler_items_per_page", "items_per_page", ITEMS_PER_PAGE_BUCKETS, "Лотов на странице выдачи"),
+    )
+    for name, field, buckets, help in histograms:
+        samples = []
+        for sec in sections:
+            hist = sec.get(field)
+            if hist:
+                samples.extend(histogram_samples(
+                    name, (("section", sec["keyword"]),), buckets, hist["counts"], hist["sum"]
+                ))
+        yield Family(name, "histogram", help, samples)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 @app.post("/admin/clear-logs")
 def clear_logs():
@@ -138,35 +374,100 @@ def clear_logs():
         deleted.append(lf.name)
     return {"status": "logs cleared", "deleted": deleted}
 
-@app.get("/admin/logs/{log_name}")
-def download_log(log_name: str):
+def log_path(log_name: str) -> Path:
     file_path = LOG_DIR / log_name
     if not file_path.exists() or file_path.parent != LOG_DIR:
         raise HTTPException(404, "Log file not found")
-    return FileResponse(path=file_path, media_type="text/plain", filename=log_name)
+    return file_path
+
+@app.get("/admin/logs/{log_name}")
+def download_log(log_name: str):
+    """
+    Лог целиком. Поддерживает Range (Accept-Ranges: bytes): чтобы докачать
+    только новое, достаточно Range: bytes=<сколько уже есть>-.
+    """
+    return FileResponse(path=log_path(log_name), media_type="text/plain", filename=log_name)
+
+@app.get("/admin/logs/{log_name}/tail")
+def tail_log(
+    log_name: str,
+    lines: int = Query(LOG_TAIL_DEFAULT, ge=1, le=LOG_TAIL_MAX),
+    follow: bool = Query(False, description="Держать соединение и присылать новые строки (SSE)"),
+):
+    """
+    Последние lines строк лога, читаются с конца файла.
+    X-Log-Offset — размер файла на момент чтения (для Range на /admin/logs/{name}).
+    С follow=true ответ — text/event-stream: сначала эти строки,
+    затем каждая новая строка отдельным событием по мере записи.
+    """
+    file_path = log_path(log_name)
+    try:
+        tail, offset = tail_lines(file_path, lines)
+    except FileNotFoundError:
+        raise HTTPException(404, "Log file not found")
+    headers = {"X-Log-Offset": str(offset)}
+
+    if not follow:
+        body = "".join(line + "\n" for line in tail)
+        return Response(content=body, media_type="text/plain; charset=utf-8", headers=headers)
+
+    async def events():
+        for line in tail:
+            yield f"data: {line}\n\n"
+        async for line in follow_lines(file_path, offset, LOG_FOLLOW_POLL, LOG_FOLLOW_HEARTBEAT):
+            yield ": keep-alive\n\n" if line is None else f"data: {line}\n\n"
+
+    headers.update({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
 
 @app.get("/car/view")
-def car_view(url: str = Query(..., description="Полная ссылка на лот, например https://www.iaai.com/VehicleDetail/43076760~US")):
+async def car_view(url: str = Query(..., description="Полная ссылка на лот, например https://www.iaai.com/VehicleDetail/43076760~US")):
     """
     Возвращает полную карточку автомобиля по ссылке или по просто переданному stock_id.
     """
     try:
-        data = car_view_func(url)
+        data = await view_cache.get(stock_id_from_url(url))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch vehicle data: {e}")
     return JSONResponse(content=data)
 
+class BatchViewRequest(BaseModel):
+    items: conlist(str, min_length=1, max_length=BATCH_MAX_ITEMS) = Field(
+        ...,
+        description="Ссылки на лоты или stock_id",
+        example=["https://www.iaai.com/VehicleDetail/43076760~US", "43052326"]
+    )
+    concurrency: int = Field(
+        BATCH_DEFAULT_CONCURRENCY,
+        ge=1,
+        le=BATCH_MAX_CONCURRENCY,
+        description="Сколько лотов загружать одновременно"
+    )
+
+@app.post("/car/view/batch")
+async def car_view_batch(req: BatchViewRequest):
+    """
+    Карточки сразу для многих лотов. Ответ — NDJSON в порядке готовности:
+    {"input", "stock_id", "ok": true, "data"} или {"input", "stock_id", "ok": false, "error"}.
+    Частота запросов к каждому хосту ограничена общим лимитом.
+    """
+    async def lines():
+        async for result in view_batch(req.items, view_cache.get, req.concurrency, BATCH_ITEM_TIMEOUT):
+            yield json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.delete("/admin/clear-jsons", status_code=200)
 def delete_all_jsons():
     """
-    Удаляет все JSON-файлы в папке JSONs.
+    Удаляет все JSON- и NDJSON-файлы в папке JSONs.
     """
     json_dir = PROJECT_ROOT / "JSONs"
     if not json_dir.is_dir():
         raise HTTPException(status_code=500, detail=f"Directory not found: {json_dir}")
 
     deleted = []
-    for file_path in json_dir.glob("*.json"):
+    for file_path in [*json_dir.glob("*.json"), *json_dir.glob("*.ndjson")]:
         try:
             file_path.unlink()
             deleted.append(file_path.name)
@@ -183,7 +484,7 @@ def delete_all_jsons():
 def delete_single_json(name: str):
     """
     Удаляет указанный JSON-файл из папки JSONs.
-    Параметр name указывается без расширения .json.
+    Параметр name указывается без расширения .json (или .ndjson).
     """
     json_dir = PROJECT_ROOT / "JSONs"
     if not json_dir.is_dir():
@@ -191,6 +492,9 @@ def delete_single_json(name: str):
 
     filename = f"{name}.json"
     file_path = json_dir / filename
+    if not file_path.exists() and (json_dir / f"{name}.ndjson").exists():
+        filename = f"{name}.ndjson"
+        file_path = json_dir / filename
     if not file_path.exists():
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
 
@@ -231,6 +535,34 @@ class SectionsConfig(BaseModel):
         ge=1,
         description="Размер страницы (число лотов за запрос)"
     )
+    output_format: Literal["ndjson", "json"] = Field(
+        "ndjson",
+        description="ndjson — дописывать лоты страницы в {keyword}_lots.ndjson, "
+                    "json — переписывать весь {keyword}_lots.json"
+    )
+    page_concurrency: int = Field(
+        1,
+        ge=1,
+        le=16,
+        description="Сколько страниц раздела загружать одновременно (1 — по одной с паузой 2–5 с)"
+    )
+    proxy_rate: float = Field(
+        1.0,
+        ge=0,
+        description="Не больше стольких запросов в секунду на порт прокси (0 — без лимита)"
+    )
+    parse_workers: int = Field(
+        0,
+        ge=0,
+        le=16,
+        description="Процессов разбора страниц на раздел (0 — разбор в процессе раздела)"
+    )
+    pipeline_queue: int = Field(
+        8,
+        ge=1,
+        le=64,
+        description="Сколько страниц держать между стадиями загрузка → разбор → запись"
+    )
 
 def read_config() -> SectionsConfig:
     try:
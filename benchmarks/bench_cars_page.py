@@ -0,0 +1,65 @@
+"""
+Пропускная способность сборки страницы /cars:
+  - было:  валидация dict → Car и JSON-кодирование (response_model=List[Car])
+  - стало: склейка заранее закодированных лотов (LotDataset.page_fragments)
+
+Запуск из корня проекта:  python -m benchmarks.bench_cars_page
+"""
+import time
+from bisect import bisect_right
+from typing import List
+
+from pydantic import TypeAdapter
+
+from api import Car
+from lot_store import LotDataset
+from lot_store.loader import LOT_FIELDS
+from benchmarks.sample_lots import make_lots
+
+N_LOTS = 100_000
+LIMITS = (100, 1000)
+DURATION = 2.0  # секунд на каждый замер
+
+
+def pages_per_sec(build_page, limit: int) -> float:
+    last_id, pages = 0, 0
+    deadline = time.perf_counter() + DURATION
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        build_page(last_id, limit)
+        pages += 1
+        last_id = (last_id + limit) % (N_LOTS - limit)
+    return pages / (time.perf_counter() - start)
+
+
+def main():
+    lots = make_lots(N_LOTS)
+    for lot in lots:
+        lot["lot_id"] = int(lot["lot_id"])
+    dataset = LotDataset.from_lots({"bench": lots})
+    adapter = TypeAdapter(List[Car])
+
+    def pydantic_page(last_id, limit):
+        # прежний путь: срез списка словарей → валидация → кодирование
+        start = bisect_right(dataset.lot_ids, last_id)
+        return adapter.dump_json(adapter.validate_python(lots[start:start + limit]))
+
+    def fragments_page(last_id, limit):
+        fragments, _ = dataset.page_fragments(last_id, limit)
+        return b"[" + b",".join(fragments) + b"]"
+
+    # обе ветки должны отдавать один и тот же JSON
+    assert pydantic_page(0, 10) == fragments_page(0, 10), "payload mismatch"
+    print(f"{N_LOTS} лотов, поля Car: {len(LOT_FIELDS)}")
+
+    for limit in LIMITS:
+        before = pages_per_sec(pydantic_page, limit)
+        after = pages_per_sec(fragments_page, limit)
+        print(
+            f"limit={limit:>4}: pydantic {before:9.1f} стр/с | "
+            f"fragments {after:9.1f} стр/с | x{after / before:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
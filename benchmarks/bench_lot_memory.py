@@ -0,0 +1,86 @@
+"""
+Память под лоты в процессе API:
+  - было:  список словарей из json.load (как загружал api.py раньше)
+  - стало: LotStore — колонки, готовый JSON лотов и все индексы;
+           отдельно — сколько из этого занимают заголовки секций
+           (LotColumns.titles), которые держатся ради пересборки поиска
+
+Запуск из корня проекта:  python -m benchmarks.bench_lot_memory
+"""
+import gc
+import json
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from lot_store import LotStore
+from benchmarks.sample_lots import make_lots
+
+N_LOTS = 100_000
+
+
+def retained(build) -> tuple[object, int]:
+    """Сколько байт остаётся занято объектом, который вернул build()."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def load_dict_list(data_dir: Path) -> list[dict]:
+    cars = []
+    for path in data_dir.glob("*_lots.json"):
+        with open(path, encoding="utf-8") as f:
+            for item in json.load(f):
+                item["lot_id"] = int(item.get("lot_id", 0))
+                cars.append(item)
+    cars.sort(key=lambda x: x["lot_id"])
+    return cars
+
+
+def load_store(data_dir: Path) -> LotStore:
+    store = LotStore(data_dir)
+    store.reload()
+    return store
+
+
+def titles_bytes(store: LotStore) -> int:
+    """Списки заголовков секций и сами строки."""
+    seen = set()
+    total = 0
+    for columns in store._sections.values():
+        total += sys.getsizeof(columns.titles)
+        for title in columns.titles:
+            if id(title) not in seen:
+                seen.add(id(title))
+                total += sys.getsizeof(title)
+    return total
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        with open(data_dir / "bench_lots.json", "w", encoding="utf-8") as f:
+            json.dump(make_lots(N_LOTS), f, ensure_ascii=False, indent=2)
+
+        cars, dict_bytes = retained(lambda: load_dict_list(data_dir))
+        del cars
+        store, store_bytes = retained(lambda: load_store(data_dir))
+        assert len(store.dataset) == N_LOTS
+        title_bytes = titles_bytes(store)
+
+    mb = 1024 * 1024
+    print(f"{N_LOTS} лотов")
+    print(f"список словарей: {dict_bytes / mb:8.1f} MB ({dict_bytes / N_LOTS:6.0f} B/лот)")
+    print(f"LotStore:        {store_bytes / mb:8.1f} MB ({store_bytes / N_LOTS:6.0f} B/лот)")
+    print(f"  из них title:  {title_bytes / mb:8.1f} MB ({title_bytes / N_LOTS:6.0f} B/лот)")
+    print(f"экономия: x{dict_bytes / store_bytes:.1f}")
+
+
+if __name__ == "__main__":
+    main()
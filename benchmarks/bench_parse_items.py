@@ -0,0 +1,156 @@
+"""
+Разбор страницы выдачи поиска (parser.parser.parse_items):
+  - было:  13 вызовов row.find(span, title=lambda) на лот — обход всей строки
+           на каждое поле, select_one на Stock #, текст ячейки аукциона дважды
+           и dateutil на каждый лот
+  - стало: один проход по строке (scan_row), дата разбирается раз на страницу;
+           отдельно — то же с деревом от lxml, если он установлен
+
+Записанных страниц выдачи в репозитории нет — по умолчанию страница
+синтетическая (benchmarks.sample_search_page, 100 лотов); сохранённые
+страницы можно передать аргументами.
+
+Запуск из корня проекта:  python -m benchmarks.bench_parse_items [страница.html ...]
+"""
+import re
+import sys
+import time
+import warnings
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from dateutil import parser as date_parser
+
+from parser.parser import items_from_soup, parse_items
+from benchmarks.sample_search_page import make_search_page
+
+DURATION = 2.0  # секунд на каждый замер
+
+
+def legacy_parse_items(html: str) -> list[dict]:
+    return legacy_items_from_soup(BeautifulSoup(html, "html.parser"))
+
+
+def legacy_items_from_soup(soup) -> list[dict]:
+    # прежняя реализация parse_items без изменений (кроме построения дерева)
+    cards = soup.select("div.table-cell--data.p-0")
+    items = []
+
+    for card in cards:
+        a = card.find("a")
+        if not a:
+            continue
+        row = card.find_parent("div", class_="table-row-inner")
+
+        def get_span(key: str) -> str:
+            tag = row.find("span", title=lambda t: t and key in t)
+            return tag.text.strip() if tag else "N/A"
+
+        title = a.text.strip()
+        link = "https://www.iaai.com" + a["href"]
+        vin = get_span("Please log in as a buyer")
+
+        stock_el = row.select_one(
+            "ul.data-list--search li.data-list__item "
+            "span.data-list__value[title^='Stock #:']"
+        )
+        lot_id = stock_el.text.strip() if stock_el else "N/A"
+
+        preview = (row.find("img") or {}).get("data-src", "N/A")
+        auc_date = (row.find("div", class_="table-cell-horizontal-center") or {}).get_text(strip=True)
+
+        raw = (row.find("div", class_="table-cell-horizontal-center") or {}).get_text(" ", strip=True)
+        m = re.match(r'^(.*?(?:am|pm)\s*[A-Z]{2,4})', raw, re.IGNORECASE)
+        if m:
+            try:
+                dt = date_parser.parse(m.group(1))
+                auc_date = dt.strftime("%Y-%m-%d %H:%M:%S")
+            except Exception:
+                auc_date = raw
+        else:
+            auc_date = raw
+
+        items.append({
+            "title": title,
+            "link": link,
+            "lot_id": lot_id,
+            "vin": vin,
+            "preview": preview,
+            "odometer": get_span("Odometer"),
+            "damage": get_span("Primary Damage"),
+            "run_and_drive": get_span("Run & Drive"),
+            "airbags": get_span("Airbags"),
+            "key": get_span("Key"),
+            "engine": get_span("Engine"),
+            "fuel_type": get_span("Fuel Type"),
+            "cylinders": get_span("Cylinder"),
+            "branch": get_span("Branch"),
+            "country": get_span("Country"),
+            "acv": get_span("ACV"),
+            "auction_date": auc_date,
+        })
+
+    return items
+
+
+def has_lxml() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def cards_per_sec(fn, cards: int) -> float:
+    pages = 0
+    deadline = time.perf_counter() + DURATION
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        fn()
+        pages += 1
+    return pages * cards / (time.perf_counter() - start)
+
+
+def main():
+    # dateutil предупреждает о каждой TZ-аббревиатуре вроде CDT
+    warnings.simplefilter("ignore")
+    if sys.argv[1:]:
+        pages = [(Path(p).name, Path(p).read_text("utf-8")) for p in sys.argv[1:]]
+    else:
+        pages = [("synthetic-100", make_search_page(100))]
+
+    variants = [("parse_items", parse_items)]
+    if has_lxml():
+        variants.append(("parse_items+lxml", lambda html: parse_items(html, "lxml")))
+
+    for name, html in pages:
+        expected = legacy_parse_items(html)
+        cards = len(expected)
+        if not cards:
+            print(f"{name}: лотов не найдено, пропуск")
+            continue
+        # все ветки должны отдавать те же лоты
+        for label, fn in variants:
+            assert fn(html) == expected, f"{name}: {label} mismatch"
+
+        # только извлечение полей из готового дерева
+        soup = BeautifulSoup(html, "html.parser")
+        before = cards_per_sec(lambda: legacy_items_from_soup(soup), cards)
+        after = cards_per_sec(lambda: items_from_soup(soup), cards)
+        print(
+            f"{name}: поля     было {before:9.1f} лот/с | "
+            f"стало {after:9.1f} лот/с | x{after / before:.1f}"
+        )
+
+        # страница целиком: построение дерева + поля
+        before = cards_per_sec(lambda: legacy_parse_items(html), cards)
+        for label, fn in variants:
+            after = cards_per_sec(lambda: fn(html), cards)
+            print(
+                f"{name}: страница было {before:9.1f} лот/с | "
+                f"{label} {after:9.1f} лот/с | x{after / before:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
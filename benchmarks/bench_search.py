@@ -0,0 +1,64 @@
+"""
+Задержка /cars/search (LotDataset.search) на 500k лотов, limit=100:
+первый запрос (развороты фрагментов ещё не в кеше) и медиана повторов.
+Цель — меньше TARGET_MS на каждом запросе; иначе бенчмарк падает.
+
+Запуск из корня проекта:  python -m benchmarks.bench_search
+"""
+import statistics
+import time
+
+from lot_store import LotDataset
+from benchmarks.sample_lots import make_lots
+
+N_LOTS = 500_000
+LIMIT = 100
+REPEATS = 20
+TARGET_MS = 10.0
+QUERIES = (
+    "2019 BMW X5",  # точный уровень: пересечение трёх слов
+    "bmw x5",
+    "x",            # короткий фрагмент: начало слов x5, x3
+    "20",           # начало всех годов 20xx
+    "camr",         # подстрока одного слова
+    "ford 150",
+    "201 civ",      # оба токена — только частичные совпадения
+)
+
+
+def ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    lots = make_lots(N_LOTS)
+    for lot in lots:
+        lot["lot_id"] = int(lot["lot_id"])
+    start = time.perf_counter()
+    dataset = LotDataset.from_lots({"bench": lots})
+    del lots
+    print(f"{N_LOTS} лотов, снимок собран за {time.perf_counter() - start:.1f} с")
+
+    slow = []
+    for query in QUERIES:
+        first = ms(lambda: dataset.search(query, LIMIT))
+        items, cursor = dataset.search(query, LIMIT)
+        # вторая страница той же выдачи — по курсору
+        page2 = ms(lambda: dataset.search(query, LIMIT, cursor)) if cursor else 0.0
+        median = statistics.median(ms(lambda: dataset.search(query, LIMIT)) for _ in range(REPEATS))
+        worst = max(first, median, page2)
+        print(
+            f"{query!r:>15}: {len(items):3} лотов | первый {first:6.2f} мс | "
+            f"медиана {median:6.2f} мс | стр.2 {page2:6.2f} мс"
+        )
+        if worst >= TARGET_MS:
+            slow.append(f"{query!r} {worst:.1f} мс")
+
+    assert not slow, f"дольше {TARGET_MS} мс: {', '.join(slow)}"
+    print(f"все запросы быстрее {TARGET_MS} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Разбор карточки лота (vehicle_view.parser) на сохранённых страницах:
+  - было:  ~30 вызовов soup.find с лямбдой — полный обход дерева на каждый лейбл
+  - стало: один проход по span.data-list__label → словарь лейбл → span
+
+Запуск из корня проекта:  python -m benchmarks.bench_vehicle_parse [страница.html ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from vehicle_view.parser import LABELS, label_values, parse_html
+
+SAMPLE_PAGES = (Path(__file__).resolve().parent.parent / "Save" / "vehicle.html",)
+DURATION = 2.0  # секунд на каждый замер
+
+
+def legacy_label_values(soup) -> dict:
+    # прежний путь: отдельный поиск по всему дереву на каждый лейбл
+    result = {}
+    for label in LABELS:
+        lbl = soup.find(
+            lambda t:
+                t.name == "span"
+                and t.get("class") and "data-list__label" in t.get("class")
+                and t.get_text(strip=True).startswith(f"{label}:")
+        )
+        if not lbl:
+            result[label] = None
+            continue
+        val = None
+        for sib in lbl.next_siblings:
+            if getattr(sib, "get", None) and "data-list__value" in (sib.get("class") or []):
+                text = sib.get_text(" ", strip=True)
+                if label == "Auction Date and Time":
+                    text = " ".join(text.split())
+                val = text or None
+                break
+        result[label] = val
+    return result
+
+
+def ms_per_call(fn) -> float:
+    calls = 0
+    deadline = time.perf_counter() + DURATION
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        fn()
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    paths = [Path(p) for p in sys.argv[1:]] or list(SAMPLE_PAGES)
+    for path in paths:
+        html = path.read_text("utf-8")
+        soup = BeautifulSoup(html, "html.parser")
+
+        # обе ветки должны находить одни и те же поля
+        assert label_values(soup) == legacy_label_values(soup), f"{path.name}: fields mismatch"
+
+        # только поиск полей по готовому дереву
+        before = ms_per_call(lambda: legacy_label_values(soup))
+        after = ms_per_call(lambda: label_values(soup))
+        print(
+            f"{path.name}: лейблы  было {before:7.2f} мс | "
+            f"стало {after:7.2f} мс | x{before / after:.1f}"
+        )
+
+        # страница целиком: BeautifulSoup + поля (+ скрипты у нового parse_html)
+        before = ms_per_call(lambda: legacy_label_values(BeautifulSoup(html, "html.parser")))
+        after = ms_per_call(lambda: parse_html(html))
+        print(
+            f"{path.name}: страница было {before:7.2f} мс | "
+            f"стало {after:7.2f} мс | x{before / after:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Синтетические лоты в формате parser.runner для бенчмарков.
+"""
+import random
+
+MAKES = ["BMW", "AUDI", "TOYOTA", "HONDA", "FORD", "CHEVROLET", "NISSAN"]
+MODELS = ["X5", "X3", "330I", "A4", "Q7", "CAMRY", "CIVIC", "F-150", "MALIBU", "ALTIMA"]
+DAMAGES = ["Front End", "Rear", "Side", "All Over", "Hail", "Flood", "Mechanical"]
+BRANCHES = [f"Branch {i}" for i in range(1, 200)]
+FUELS = ["Gasoline", "Diesel", "Electric", "Hybrid"]
+
+
+def make_lot(lot_id: int, rnd: random.Random) -> dict:
+    stock = str(40000000 + lot_id)
+    return {
+        "title": f"{rnd.randint(2005, 2024)} {rnd.choice(MAKES)} {rnd.choice(MODELS)}",
+        "link": f"https://www.iaai.com/VehicleDetail/{stock}~US",
+        "lot_id": str(lot_id),
+        "vin": "WBA" + "*" * 14,
+        "preview": f"https://vis.iaai.com/resizer?imageKeys={stock}~SID~I1&width=400&height=300",
+        "odometer": f"{rnd.randint(1, 250000):,} mi (Actual)",
+        "damage": rnd.choice(DAMAGES),
+        "run_and_drive": rnd.choice(["Run & Drive", "Stationary", "Starts"]),
+        "airbags": rnd.choice(["Intact", "Deployed"]),
+        "key": rnd.choice(["Present", "Missing"]),
+        "engine": f"{rnd.choice(['2.0L', '3.0L', '5.0L'])} {rnd.choice(['I4', 'I6', 'V8'])}",
+        "fuel_type": rnd.choice(FUELS),
+        "cylinders": rnd.choice(["4", "6", "8"]),
+        "branch": rnd.choice(BRANCHES),
+        "country": "USA",
+        "acv": f"${rnd.randint(1000, 90000):,}.00 USD",
+        "auction_date": f"2025-07-{rnd.randint(1, 28):02d} 10:00:00",
+        "stock#": stock,
+        "photos": [
+            f"https://vis.iaai.com/resizer?imageKeys={stock}~SID~I{i}&width=1000&height=300"
+            for i in range(1, 12)
+        ],
+    }
+
+
+def make_lots(n: int, seed: int = 0) -> list[dict]:
+    rnd = random.Random(seed)
+    return [make_lot(i, rnd) for i in range(1, n + 1)]
@@ -0,0 +1,86 @@
+"""
+Синтетическая страница выдачи поиска IAAI для бенчмарков parser.parser:
+разметка строки повторяет то, на что опирается parse_items (table-row-inner,
+table-cell--data p-0, ul.data-list--search, span[title], ячейка аукциона),
+значения — из sample_lots.
+"""
+import random
+from html import escape
+
+from benchmarks.sample_lots import make_lots
+
+AUCTION_TIMES = (
+    "Tue Jul 15, 11:30am CDT",
+    "Wed Jul 16, 9:00am EDT",
+    "Thu Jul 17, 10:00am PDT",
+)
+
+
+def _item(label: str, value: str, title: str = "") -> str:
+    title = escape(title or f"{label}: {value}")
+    return (
+        f'<li class="data-list__item">'
+        f'<span class="data-list__label">{escape(label)}:</span> '
+        f'<span class="data-list__value" title="{title}">{escape(value)}</span>'
+        f'</li>'
+    )
+
+
+def make_row(lot: dict, auction_time: str) -> str:
+    stock = lot["stock#"]
+    href = f"/VehicleDetail/{stock}~US"
+    left = "".join((
+        _item("Stock #", stock),
+        _item("VIN", lot["vin"], "VIN: Please log in as a buyer to see the full VIN"),
+        _item("Odometer", lot["odometer"]),
+        _item("Primary Damage", lot["damage"]),
+        _item("Run & Drive", lot["run_and_drive"]),
+        _item("Airbags", lot["airbags"]),
+    ))
+    middle = "".join((
+        _item("Key", lot["key"]),
+        _item("Engine", lot["engine"]),
+        _item("Fuel Type", lot["fuel_type"]),
+        _item("Cylinders", lot["cylinders"]),
+    ))
+    right = "".join((
+        _item("Branch", lot["branch"]),
+        _item("Country", lot["country"]),
+        _item("ACV", lot["acv"]),
+    ))
+    return f"""
+<div class="table-row table-row-border">
+  <div class="table-row-inner">
+    <div class="table-cell table-cell--image">
+      <a href="{href}"><img class="lazyload" src="/img/placeholder.png" data-src="{escape(lot['preview'])}" alt=""></a>
+    </div>
+    <div class="table-cell table-cell--data p-0">
+      <h4 class="heading-7 rtl-disabled"><a href="{href}" class="link-primary">{escape(lot['title'])}</a></h4>
+      <div class="data-container">
+        <div class="data-container__item"><ul class="data-list data-list--search">{left}</ul></div>
+        <div class="data-container__item"><ul class="data-list data-list--search">{middle}</ul></div>
+        <div class="data-container__item"><ul class="data-list data-list--search">{right}</ul></div>
+      </div>
+    </div>
+    <div class="table-cell table-cell--status">
+      <div class="table-cell-horizontal-center">
+        <span class="data-list__value">{auction_time}</span>
+        <a class="btn btn-sm btn-primary" href="{href}#prebid">Pre-Bid</a>
+        <a class="link" href="/SaleList">View Sale List</a>
+      </div>
+    </div>
+  </div>
+</div>"""
+
+
+def make_search_page(n: int = 100, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    rows = "".join(make_row(lot, rnd.choice(AUCTION_TIMES)) for lot in make_lots(n, seed))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Search Vehicles | IAA</title></head>
+<body>
+<header class="header"><nav><a href="/">IAA</a> <a href="/Search">Search</a></nav></header>
+<main><div class="table table--search" id="dvSearchList">{rows}
+</div></main>
+<footer class="footer"><a href="/Home/About">About</a></footer>
+</body></html>"""
@@ -0,0 +1,3 @@
+from .tail import tail_lines, follow_lines
+
+__all__ = ["tail_lines", "follow_lines"]
@@ -0,0 +1,91 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+BLOCK_SIZE = 64 * 1024
+
+
+def tail_lines(path: Path, lines: int) -> tuple[list[str], int]:
+    """
+    Последние lines строк файла — читаем блоками с конца, пока не наберём
+    нужное число переводов строк, весь файл не трогаем.
+    Возвращает (строки, размер файла на момент чтения) — с этого смещения
+    можно продолжать: follow_lines(..., offset) или Range: bytes=<offset>-.
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        if lines <= 0 or end == 0:
+            return [], end
+
+        pos = end
+        chunks: list[bytes] = []
+        newlines = 0
+        # последний перевод строки в конце файла строку не начинает
+        need = lines + 1
+        while pos > 0 and newlines < need:
+            step = min(BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            chunks.append(block)
+            newlines += block.count(b"\n")
+
+    raw = b"".join(reversed(chunks)).split(b"\n")
+    if raw[-1] == b"":
+        raw.pop()
+    return [
+        line.rstrip(b"\r").decode("utf-8", errors="replace") for line in raw[-lines:]
+    ], end
+
+
+async def follow_lines(
+    path: Path,
+    offset: int,
+    poll: float = 0.5,
+    heartbeat: float = 15.0,
+) -> AsyncIterator[Optional[str]]:
+    """
+    Новые строки, дописанные в файл после offset, по мере появления.
+    Незаконченная строка (без \\n) ждёт своего конца. Если файл удалили
+    (/admin/clear-logs) или обрезали — ждём и читаем новый с начала.
+    Раз в heartbeat секунд тишины отдаёт None, чтобы держать соединение.
+    """
+    pending = b""
+    ident = None
+    idle = 0.0
+    while True:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            st = None
+
+        if st is not None:
+            if ident is None:
+                ident = (st.st_dev, st.st_ino)
+            elif (st.st_dev, st.st_ino) != ident or st.st_size < offset:
+                # файл пересоздан или обрезан
+                ident = (st.st_dev, st.st_ino)
+                offset, pending = 0, b""
+
+            if st.st_size > offset:
+                data = await asyncio.to_thread(_read_from, path, offset, st.st_size)
+                offset += len(data)
+                *complete, pending = (pending + data).split(b"\n")
+                for line in complete:
+                    yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+                if complete:
+                    idle = 0.0
+                    continue
+
+        await asyncio.sleep(poll)
+        idle += poll
+        if idle >= heartbeat:
+            idle = 0.0
+            yield None
+
+
+def _read_from(path: Path, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(min(end - start, BLOCK_SIZE * 16))
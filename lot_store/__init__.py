@@ -0,0 +1,8 @@
+"""
+Хранилище лотов для API: загрузка *_lots.json, снимки и горячая перезагрузка
+"""
+from .cache import GenerationCache
+from .dataset import LotDataset
+from .encoding import encode_lot
+from .store import BaseLotStore, LotSnapshot, LotStore
+from .sqlite_store import SqliteLotStore
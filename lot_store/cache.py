@@ -0,0 +1,43 @@
+import threading
+from collections import OrderedDict
+
+
+class GenerationCache:
+    """
+    LRU-кеш, привязанный к поколению данных: первое обращение
+    с новым generation сбрасывает всё, что было закешировано раньше.
+    Обращения с поколением старше текущего (запрос начался до перезагрузки)
+    кеш не трогают: get — промах, put — игнорируется.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.generation = None
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync(self, generation: int) -> bool:
+        if self.generation is not None and generation < self.generation:
+            return False
+        if generation != self.generation:
+            self._items.clear()
+            self.generation = generation
+        return True
+
+    def get(self, generation: int, key):
+        with self._lock:
+            if not self._sync(generation):
+                return None
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, generation: int, key, value):
+        with self._lock:
+            if not self._sync(generation):
+                return
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
@@ -0,0 +1,219 @@
+import heapq
+import json
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from typing import Optional
+
+from .encoding import encode_lot
+from .indexes import INDEXED_FIELDS
+from .stats import LotStats
+
+
+class Categories:
+    """
+    Словарь значений категориального поля: значение ↔ код.
+    Только дополняется (из потока перезагрузки), поэтому коды,
+    выданные раньше, остаются валидными для всех снимков.
+    """
+
+    def __init__(self):
+        self.values: list = []
+        self._codes: dict = {}
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+
+def new_categories() -> dict[str, Categories]:
+    return {field: Categories() for field in INDEXED_FIELDS}
+
+
+def find(lot_ids: array, lot_id: int) -> Optional[int]:
+    """Позиция lot_id в отсортированном массиве или None."""
+    pos = bisect_left(lot_ids, lot_id)
+    return pos if pos < len(lot_ids) and lot_ids[pos] == lot_id else None
+
+
+def splice(lot_ids: array, columns: list, rows: list[tuple]) -> tuple[array, list]:
+    """
+    Копии колонок с заменёнными и вставленными строками; исходные не меняются.
+    rows — отсортированные по lot_id (lot_id, значение каждой из columns).
+    Куски между правками копируются срезами, без цикла по всем строкам.
+    """
+    out_ids = array(lot_ids.typecode)
+    outs = [array(c.typecode) if isinstance(c, array) else [] for c in columns]
+    prev = 0
+    for lot_id, *values in rows:
+        pos = bisect_left(lot_ids, lot_id, prev)
+        out_ids.extend(lot_ids[prev:pos])
+        out_ids.append(lot_id)
+        for out, column, value in zip(outs, columns, values):
+            out.extend(column[prev:pos])
+            out.append(value)
+        prev = pos + 1 if pos < len(lot_ids) and lot_ids[pos] == lot_id else pos
+    out_ids.extend(lot_ids[prev:])
+    for out, column in zip(outs, columns):
+        out.extend(column[prev:])
+    return out_ids, outs
+
+
+def section_payload(lots: list[dict]) -> dict:
+    """
+    Секция в переносимом виде (без общих словарей): колонки, локальные
+    словари категорий и агрегаты секции. Так её можно собрать в другом
+    процессе или сохранить в снимок, а потом подключить через
+    LotColumns.from_payload.
+    """
+    local = new_categories()
+    stats = LotStats()
+    lot_ids = array("q")
+    fragments = []
+    titles = []
+    codes = {field: array("I") for field in INDEXED_FIELDS}
+    for lot in lots:
+        lot_ids.append(lot["lot_id"])
+        fragments.append(encode_lot(lot))
+        titles.append(lot.get("title") or "")
+        for field in INDEXED_FIELDS:
+            codes[field].append(local[field].code(lot.get(field)))
+        stats.add_lot(lot)
+    return {
+        "lot_ids": lot_ids,
+        "fragments": fragments,
+        "titles": titles,
+        "values": {field: local[field].values for field in INDEXED_FIELDS},
+        "codes": codes,
+        "stats": stats,
+    }
+
+
+class LotColumns:
+    """
+    Компактное колоночное представление лотов, отсортированных по lot_id:
+    lot_id — array, категориальные поля — коды в array плюс общий словарь,
+    сам лот хранится только готовым JSON (fragments), плюс отдельно title
+    (titles) — для сборки поискового индекса без разбора JSON. Словари
+    лотов не держатся — при необходимости лот восстанавливается из JSON.
+    stats — агрегаты (LotStats) ровно по этим лотам.
+    """
+
+    __slots__ = ("lot_ids", "fragments", "titles", "codes", "stats")
+
+    def __init__(self):
+        self.lot_ids = array("q")
+        self.fragments: list[bytes] = []
+        self.titles: list[str] = []
+        self.codes: dict[str, array] = {field: array("I") for field in INDEXED_FIELDS}
+        self.stats = LotStats()
+
+    def __len__(self) -> int:
+        return len(self.lot_ids)
+
+    def append(self, lot_id: int, fragment: bytes, title: str, codes):
+        self.lot_ids.append(lot_id)
+        self.fragments.append(fragment)
+        self.titles.append(title)
+        for field, code in zip(INDEXED_FIELDS, codes):
+            self.codes[field].append(code)
+
+    def row_codes(self, pos: int) -> tuple:
+        return tuple(self.codes[field][pos] for field in INDEXED_FIELDS)
+
+    @classmethod
+    def from_lots(cls, lots: list[dict], categories: dict[str, Categories]) -> "LotColumns":
+        """lots — отсортированные по lot_id словари (как из load_lot_file)."""
+        return cls.from_payload(section_payload(lots), categories)
+
+    @classmethod
+    def from_payload(cls, payload: dict, categories: dict[str, Categories]) -> "LotColumns":
+        """
+        Колонки из section_payload: локальные коды секции переводятся
+        в коды общих словарей categories.
+        """
+        cols = cls()
+        cols.lot_ids = payload["lot_ids"]
+        cols.fragments = payload["fragments"]
+        cols.titles = payload["titles"]
+        cols.stats = payload["stats"]
+        for field in INDEXED_FIELDS:
+            mapping = [categories[field].code(v) for v in payload["values"][field]]
+            local = payload["codes"][field]
+            if mapping == list(range(len(mapping))):
+                cols.codes[field] = local
+            else:
+                cols.codes[field] = array("I", [mapping[c] for c in local])
+        return cols
+
+    def upserted(
+        self,
+        lots: list[dict],
+        categories: dict[str, Categories],
+    ) -> tuple["LotColumns", list[tuple[dict, bytes]]]:
+        """
+        Копия секции с дописанными лотами (lots — отсортированы по lot_id,
+        без повторов): новые вставляются, известные заменяются, агрегаты
+        правятся на разницу. Сама секция не меняется — её читают прежние
+        снимки. Возвращает новую секцию и изменившиеся лоты с их JSON
+        (лот с прежним JSON пропускается).
+        """
+        stats = LotStats.combine([self.stats])
+        rows = []
+        changed = []
+        for lot in lots:
+            fragment = encode_lot(lot)
+            pos = find(self.lot_ids, lot["lot_id"])
+            if pos is not None:
+                if self.fragments[pos] == fragment:
+                    continue
+                stats.add_lot(json.loads(self.fragments[pos]), sign=-1)
+            stats.add_lot(lot)
+            codes = [categories[field].code(lot.get(field)) for field in INDEXED_FIELDS]
+            rows.append((lot["lot_id"], fragment, lot.get("title") or "", *codes))
+            changed.append((lot, fragment))
+        if not rows:
+            return self, changed
+
+        cols = LotColumns()
+        fields = [self.codes[field] for field in INDEXED_FIELDS]
+        cols.lot_ids, (cols.fragments, cols.titles, *codes) = splice(
+            self.lot_ids, [self.fragments, self.titles, *fields], rows
+        )
+        cols.codes = dict(zip(INDEXED_FIELDS, codes))
+        cols.stats = stats
+        return cols, changed
+
+    @classmethod
+    def merge(cls, sections: list["LotColumns"]) -> "LotColumns":
+        """
+        Слияние отсортированных секций в одну за O(n log k).
+        Повторяющийся lot_id берётся из первой по порядку секции.
+        Агрегаты — сумма агрегатов секций минус отброшенные повторы,
+        без пересчёта по всем лотам.
+        """
+        sections = [s for s in sections if len(s)]
+        if len(sections) == 1:
+            return sections[0]
+
+        merged = cls()
+        dropped = []
+        last_id = None
+        keys = heapq.merge(
+            *(zip(s.lot_ids, repeat(k), range(len(s))) for k, s in enumerate(sections))
+        )
+        for lot_id, k, pos in keys:
+            if lot_id == last_id:
+                dropped.append(sections[k].fragments[pos])
+                continue
+            last_id = lot_id
+            s = sections[k]
+            merged.append(lot_id, s.fragments[pos], s.titles[pos], s.row_codes(pos))
+
+        merged.stats = LotStats.combine(s.stats for s in sections)
+        merged.stats.update(LotStats.from_lots(json.loads(f) for f in dropped), sign=-1)
+        return merged
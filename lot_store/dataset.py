@@ -0,0 +1,168 @@
+import copy
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from .columns import Categories, LotColumns, find, new_categories, splice
+from .indexes import INDEXED_FIELDS, build_postings, edit_posting, intersect, normalize
+from .search import TIER_EXACT, TitleIndex
+from .stats import LotStats
+
+
+class LotDataset:
+    """
+    Неизменяемый снимок всех лотов, отсортированный по lot_id.
+    Собирается целиком (или копией прежнего с дописанными лотами — upserted)
+    и подменяется одной ссылкой — читатели никогда не видят наполовину
+    собранный список.
+    """
+
+    def __init__(self, sections: dict[str, LotColumns], categories: dict[str, Categories]):
+        # секции уже отсортированы по lot_id — сливаем их за O(n log k)
+        columns = LotColumns.merge([sections[name] for name in sorted(sections)])
+
+        # отсортированный массив ключей: курсор lastId ищется бинарным поиском
+        self.lot_ids = columns.lot_ids
+        # готовый JSON каждого лота: страница собирается склейкой байтов
+        self.fragments: list[bytes] = columns.fragments
+        # категориальные поля: коды по позициям + общий словарь значений
+        self.codes = columns.codes
+        self.categories = categories
+        # инвертированные индексы: поле → значение → lot_id лотов
+        self.postings = build_postings(columns.lot_ids, columns.codes, categories)
+        # агрегаты для /cars/stats, собранные из агрегатов секций
+        self.stats = columns.stats
+        # полнотекстовый индекс по title; сами заголовки снимок не держит, но их
+        # держат секции (LotColumns.titles) — по ним индекс пересобирается
+        # при перезагрузке (см. benchmarks.bench_lot_memory)
+        self.titles = TitleIndex(columns.lot_ids, columns.titles)
+
+    @classmethod
+    def from_lots(cls, sections: dict[str, list[dict]]) -> "LotDataset":
+        """Снимок из словарей лотов (отсортированных по lot_id) — для скриптов и бенчмарков."""
+        categories = new_categories()
+        return cls(
+            {name: LotColumns.from_lots(lots, categories) for name, lots in sections.items()},
+            categories,
+        )
+
+    def __len__(self) -> int:
+        return len(self.lot_ids)
+
+    def upserted(
+        self,
+        sections: dict[str, LotColumns],
+        changes: dict[str, list[tuple[dict, bytes]]],
+    ) -> "LotDataset":
+        """
+        Новый снимок с лотами, дописанными в секции, без полной пересборки:
+        changes — изменившиеся лоты по секциям (из LotColumns.upserted),
+        sections — уже обновлённые секции. Колонки копируются срезами,
+        в индексах копируются только затронутые списки, агрегаты правятся
+        на разницу. Повторяющийся lot_id, как и при слиянии, берётся из
+        первой по имени секции.
+        """
+        names = sorted(sections)
+        winners = {}
+        for name in sorted(changes):
+            earlier = [sections[n].lot_ids for n in names if n < name]
+            for lot, fragment in changes[name]:
+                if all(find(lot_ids, lot["lot_id"]) is None for lot_ids in earlier):
+                    winners[lot["lot_id"]] = (lot, fragment)
+        if not winners:
+            return self
+
+        stats = LotStats.combine([self.stats])
+        rows = []
+        titles = []
+        edits: dict[tuple[str, str], tuple[list, list]] = {}  # (поле, значение) → (добавить, убрать)
+        for lot_id in sorted(winners):
+            lot, fragment = winners[lot_id]
+            codes = [self.categories[field].code(lot.get(field)) for field in INDEXED_FIELDS]
+            old_codes = [None] * len(INDEXED_FIELDS)
+            old_title = ""
+            pos = find(self.lot_ids, lot_id)
+            if pos is not None:
+                old = json.loads(self.fragments[pos])
+                stats.add_lot(old, sign=-1)
+                old_title = old.get("title") or ""
+                old_codes = [self.codes[field][pos] for field in INDEXED_FIELDS]
+            stats.add_lot(lot)
+            titles.append((lot_id, old_title, lot.get("title") or ""))
+            for field, old_code, code in zip(INDEXED_FIELDS, old_codes, codes):
+                old_key, key = self._key(field, old_code), self._key(field, code)
+                if old_key == key:
+                    continue
+                if old_key is not None:
+                    edits.setdefault((field, old_key), ([], []))[1].append(lot_id)
+                if key is not None:
+                    edits.setdefault((field, key), ([], []))[0].append(lot_id)
+            rows.append((lot_id, fragment, *codes))
+
+        dataset = copy.copy(self)
+        fields = [self.codes[field] for field in INDEXED_FIELDS]
+        dataset.lot_ids, (dataset.fragments, *codes) = splice(self.lot_ids, [self.fragments, *fields], rows)
+        dataset.codes = dict(zip(INDEXED_FIELDS, codes))
+        dataset.postings = {field: dict(values) for field, values in self.postings.items()}
+        for (field, key), (add, remove) in edits.items():
+            posting = edit_posting(self.postings[field].get(key, array("q")), add, remove)
+            if len(posting):
+                dataset.postings[field][key] = posting
+            else:
+                dataset.postings[field].pop(key, None)
+        dataset.stats = stats
+        dataset.titles = self.titles.updated(titles)
+        return dataset
+
+    def _key(self, field: str, code: Optional[int]) -> Optional[str]:
+        """Ключ postings для кода значения (None — лот в индекс не попадает)."""
+        value = None if code is None else self.categories[field].values[code]
+        return None if value is None else normalize(value)
+
+    def page_fragments(
+        self,
+        last_id: int,
+        limit: int,
+        filters: Optional[dict[str, str]] = None,
+    ) -> tuple[list[bytes], Optional[int]]:
+        """
+        Keyset-страница: первые limit лотов с lot_id > last_id,
+        удовлетворяющих всем фильтрам вида {поле: значение}, — готовым
+        JSON лотов, плюс lot_id последнего.
+        """
+        positions = self._positions(last_id, limit, filters)
+        if not positions:
+            return [], None
+        return [self.fragments[pos] for pos in positions], self.lot_ids[positions[-1]]
+
+    def _positions(self, last_id: int, limit: int, filters: Optional[dict[str, str]]):
+        if not filters:
+            start = bisect_right(self.lot_ids, last_id)
+            return range(start, min(start + limit, len(self.lot_ids)))
+
+        postings = []
+        for field, value in filters.items():
+            posting = self.postings[field].get(normalize(value))
+            if not posting:
+                return []
+            postings.append(posting)
+        return [bisect_left(self.lot_ids, lot_id) for lot_id in intersect(postings, last_id + 1, limit)]
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        cursor: Optional[tuple[int, int]] = None,
+    ) -> tuple[list[dict], Optional[tuple[int, int]]]:
+        """
+        Ранжированный поиск по title. cursor — (уровень, lot_id) последнего
+        выданного лота; возвращает лоты и курсор для следующей страницы
+        (None, если выдача закончилась).
+        """
+        tier, last_id = cursor or (TIER_EXACT, 0)
+        hits = self.titles.match(query, tier, last_id + 1, limit)
+        lots = [json.loads(self.fragments[bisect_left(self.lot_ids, lot_id)]) for _, lot_id in hits]
+        if len(hits) < limit:
+            return lots, None
+        return lots, hits[-1]
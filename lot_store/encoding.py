@@ -0,0 +1,12 @@
+import json
+
+from .loader import LOT_FIELDS
+
+
+def encode_lot(lot: dict) -> bytes:
+    """JSON-объект лота ровно с полями Car, компактно и в UTF-8."""
+    return json.dumps(
+        {f: lot.get(f) for f in LOT_FIELDS},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
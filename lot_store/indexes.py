@@ -0,0 +1,153 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+from typing import Iterable, Optional
+
+# низкокардинальные поля Car, по которым строятся инвертированные индексы
+INDEXED_FIELDS = ("damage", "branch", "fuel_type", "run_and_drive", "key", "country")
+# пересечение списков: первый блок ведущего списка, предел роста блока и во
+# сколько раз окно другого списка должно быть длиннее блока, чтобы вместо
+# множества проверять ключи бинарным поиском
+CHUNK = 256
+MAX_CHUNK = 16384
+SEEK_RATIO = 16
+
+
+def normalize(value) -> str:
+    """Ключ индекса: без пробелов по краям и без учёта регистра."""
+    return str(value).strip().casefold()
+
+
+def build_postings(lot_ids: array, codes: dict[str, array], categories: dict) -> dict[str, dict[str, array]]:
+    """
+    поле → нормализованное значение → отсортированный массив lot_id лотов.
+    codes — колонки кодов (LotColumns.codes) по порядку lot_ids, categories —
+    их словари. Ключи — lot_id, а не позиции: дописанный лот не сдвигает
+    чужие записи, и индекс правится точечно (edit_posting).
+    """
+    index = {}
+    for field, column in codes.items():
+        by_code: dict[int, list[int]] = {}
+        for lot_id, code in zip(lot_ids, column):
+            by_code.setdefault(code, []).append(lot_id)
+
+        # разные написания одного значения ("Rear" / "REAR") — один ключ
+        by_value: dict[str, list[list[int]]] = {}
+        values = categories[field].values
+        for code, positions in by_code.items():
+            if values[code] is None:
+                continue
+            by_value.setdefault(normalize(values[code]), []).append(positions)
+        index[field] = {
+            value: array("q", parts[0] if len(parts) == 1 else sorted(chain.from_iterable(parts)))
+            for value, parts in by_value.items()
+        }
+    return index
+
+
+def edit_posting(posting: array, add: Iterable[int] = (), remove: Iterable[int] = ()) -> array:
+    """
+    Копия отсортированного списка с добавленными и убранными ключами:
+    куски между правками копируются срезами. Сам posting не меняется —
+    его читают прежние снимки.
+    """
+    out = array(posting.typecode)
+    prev = 0
+    for key, keep in sorted([(k, False) for k in remove] + [(k, True) for k in add]):
+        i = bisect_left(posting, key, prev)
+        out.extend(posting[prev:i])
+        if keep:
+            out.append(key)
+        prev = i + 1 if i < len(posting) and posting[i] == key else i
+    out.extend(posting[prev:])
+    return out
+
+
+def iter_union(postings, start: int = 0):
+    """
+    Ленивое объединение отсортированных списков lot_id, начиная с start:
+    heap-merge без повторов, ничего не собирается целиком.
+    """
+    # memoryview — срез без копирования; массивы индексов после сборки не меняются
+    streams = [memoryview(p)[bisect_left(p, start):] for p in postings if len(p)]
+    if len(streams) == 1:
+        yield from streams[0]
+        return
+    last = None
+    for pos in heapq.merge(*streams):
+        if pos != last:
+            yield pos
+            last = pos
+
+
+def _lead_blocks(lead: tuple, start: int):
+    """Позиции ведущего списка (или объединения) блоками растущего размера."""
+    chunk = CHUNK
+    if len(lead) == 1:
+        posting = lead[0]
+        i = bisect_left(posting, start)
+        while i < len(posting):
+            yield posting[i:i + chunk]
+            i += chunk
+            chunk = min(chunk * 2, MAX_CHUNK)
+        return
+    stream = iter_union(lead, start)
+    while True:
+        block = list(islice(stream, chunk))
+        if not block:
+            return
+        yield block
+        chunk = min(chunk * 2, MAX_CHUNK)
+
+
+def iter_intersect(postings, start: int = 0):
+    """
+    Ленивое пересечение отсортированных списков lot_id, начиная с start.
+    Элемент postings — массив или кортеж массивов (их объединение).
+    Ведущий — самый короткий: его ключи идут блоками (каждый вдвое больше
+    предыдущего), блок сверяется с окном остальных списков в том же
+    диапазоне — пересечением множеств или, если окно намного длиннее блока,
+    бинарным поиском. Стоимость зависит от просмотренного диапазона,
+    а не от длины списков, и обход кончается, как только потребитель
+    набрал нужное.
+    """
+    sources = [tuple(p for p in (s if isinstance(s, tuple) else (s,)) if len(p)) for s in postings]
+    if not sources or not all(sources):
+        return
+    sources.sort(key=lambda s: sum(len(p) for p in s))
+    lead, others = sources[0], sources[1:]
+    cursors = [[bisect_left(p, start) for p in s] for s in others]
+    for block in _lead_blocks(lead, start):
+        hi = block[-1]
+        for source, cursor in zip(others, cursors):
+            ends = [bisect_right(p, hi, c) for p, c in zip(source, cursor)]
+            if sum(e - c for e, c in zip(ends, cursor)) > SEEK_RATIO * len(block):
+                ranges = list(zip(source, cursor, ends))
+                if len(ranges) == 1:
+                    p, c, e = ranges[0]
+                    block = [pos for pos in block if contains(p, pos, c, e)]
+                else:
+                    block = [
+                        pos for pos in block
+                        if any(contains(p, pos, c, e) for p, c, e in ranges)
+                    ]
+            else:
+                present = set()
+                for p, c, e in zip(source, cursor, ends):
+                    present.update(p[c:e])
+                block = sorted(present.intersection(block))
+            cursor[:] = ends
+            if not block:
+                break
+        yield from block
+
+
+def contains(posting, pos: int, lo: int = 0, hi: Optional[int] = None) -> bool:
+    i = bisect_left(posting, pos, lo, len(posting) if hi is None else hi)
+    return i < len(posting) and posting[i] == pos
+
+
+def intersect(postings, start: int, limit: int) -> list[int]:
+    """Первые limit ключей >= start, присутствующие во всех списках."""
+    return list(islice(iter_intersect(postings, start), limit))
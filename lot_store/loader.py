@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterable, NamedTuple, Optional
+
+from parser.output import iter_items, read_records
+
+LOTS_SUFFIX = "_lots.json"
+NDJSON_SUFFIX = "_lots.ndjson"  # append-only вывод parser.runner, лот на строку
+
+# поля лота, которые отдаёт API (модель Car)
+LOT_FIELDS = (
+    "lot_id", "title", "link", "vin", "preview", "odometer", "damage",
+    "run_and_drive", "airbags", "key", "engine", "fuel_type", "cylinders",
+    "branch", "country", "acv", "auction_date",
+)
+# сколько байт начала файла и перед смещением курсора сверяется при дочитывании
+PROBE_BYTES = 4096
+
+
+class FileCursor(NamedTuple):
+    """
+    Докуда прочитан NDJSON секции: файл (inode), смещение после последнего
+    прочитанного лота и отпечатки начала файла и байт перед смещением.
+    """
+    ino: int
+    offset: int
+    head: bytes
+    edge: bytes
+
+
+def section_name(path: Path) -> str:
+    """BMW_lots.json / BMW_lots.ndjson → BMW"""
+    if path.name.endswith(NDJSON_SUFFIX):
+        return path.name[:-len(NDJSON_SUFFIX)]
+    return path.name[:-len(LOTS_SUFFIX)]
+
+
+def scan_lot_files(data_dir: Path) -> dict[str, Path]:
+    """
+    Все файлы *_lots.json и *_lots.ndjson в папке, по имени секции.
+    Если у секции есть оба, берётся NDJSON — его пишет текущий парсер.
+    """
+    if not data_dir.is_dir():
+        return {}
+    files = {}
+    for p in sorted(data_dir.iterdir()):
+        if p.name.endswith(NDJSON_SUFFIX) or p.name.endswith(LOTS_SUFFIX):
+            if not p.is_file():
+                continue
+            name = section_name(p)
+            if name not in files or p.name.endswith(NDJSON_SUFFIX):
+                files[name] = p
+    return files
+
+
+def iter_lot_file(path: Path) -> Iterable[dict]:
+    if path.name.endswith(NDJSON_SUFFIX):
+        # NDJSON пишет parser.output — им же и читается
+        return iter_items(path)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_lot_file(path: Path) -> list[dict]:
+    """
+    Читает файл секции (NDJSON — потоково, по строке), приводит lot_id к int и возвращает лоты,
+    отсортированные по lot_id. Повторы lot_id схлопываются — побеждает
+    последний (самый свежий) вариант, лоты без валидного lot_id отбрасываются.
+    """
+    return _sorted_lots(iter_lot_file(path))
+
+
+def _sorted_lots(items: Iterable[dict]) -> list[dict]:
+    by_id = {}
+    for item in items:
+        try:
+            item["lot_id"] = int(item.get("lot_id", 0))
+        except (TypeError, ValueError):
+            continue
+        if item["lot_id"] > 0:
+            by_id[item["lot_id"]] = item
+    return [by_id[k] for k in sorted(by_id)]
+
+
+def _probe(f: BinaryIO, start: int, end: int) -> bytes:
+    f.seek(start)
+    return hashlib.blake2b(f.read(end - start), digest_size=16).digest()
+
+
+def _cursor(f: BinaryIO, ino: int, offset: int) -> FileCursor:
+    return FileCursor(
+        ino,
+        offset,
+        _probe(f, 0, min(PROBE_BYTES, offset)),
+        _probe(f, max(0, offset - PROBE_BYTES), offset),
+    )
+
+
+def _grown(f: BinaryIO, ino: int, size: int, cursor: FileCursor) -> bool:
+    """Файл тот же и только дописывался: compact() подменяет inode, restore_checkpoint урезает."""
+    return (
+        cursor.ino == ino
+        and cursor.offset <= size
+        and _cursor(f, ino, cursor.offset) == cursor
+    )
+
+
+def read_lot_file(
+    path: Path,
+    cursor: Optional[FileCursor] = None,
+) -> tuple[list[dict], Optional[FileCursor], bool]:
+    """
+    (лоты как у load_lot_file, курсор, прочитан ли только хвост).
+    Для NDJSON с курсором читаются лишь строки, дописанные после него, —
+    если файл только вырос, а уже прочитанное не изменилось; иначе файл
+    читается целиком. У JSON курсора нет — он всегда читается целиком.
+    """
+    if not path.name.endswith(NDJSON_SUFFIX):
+        return load_lot_file(path), None, False
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        appended = cursor is not None and _grown(f, st.st_ino, st.st_size, cursor)
+        end = cursor.offset if appended else 0
+        items = []
+        for end, item in read_records(f, end):
+            items.append(item)
+        return _sorted_lots(items), _cursor(f, st.st_ino, end), appended
@@ -0,0 +1,157 @@
+import heapq
+import re
+from array import array
+from functools import lru_cache
+from itertools import islice
+
+from .indexes import contains, edit_posting, iter_intersect
+
+WORD_RE = re.compile(r"\w+")
+EMPTY = array("q")
+
+# уровни ранжирования: сначала все слова запроса совпали целиком,
+# потом — хотя бы одно совпало только как подстрока слова
+TIER_EXACT = 2
+TIER_PARTIAL = 1
+
+
+def tokenize(text) -> list[str]:
+    return WORD_RE.findall(str(text).casefold())
+
+
+def gram_keys(token: str) -> list[str]:
+    """
+    Ключи триграммного индекса для поиска подстроки token.
+    Короткие (1–2 символа) токены ищутся как начало слова: ключ "^x5".
+    """
+    if len(token) < 3:
+        return ["^" + token]
+    return [token[i:i + 3] for i in range(len(token) - 2)]
+
+
+def word_keys(word: str) -> set[str]:
+    keys = {"^" + word[:n] for n in (1, 2) if len(word) >= n}
+    keys.update(word[i:i + 3] for i in range(len(word) - 2))
+    return keys
+
+
+def _unique(iterable):
+    last = None
+    for pos in iterable:
+        if pos != last:
+            yield pos
+            last = pos
+
+
+class TitleIndex:
+    """
+    Поиск по title: инвертированный индекс слово → lot_id лотов
+    плюс триграммный индекс по словарю (а не по лотам), который
+    разворачивает фрагмент запроса в слова, содержащие его.
+    """
+
+    def __init__(self, lot_ids=(), titles=()):
+        words: dict[str, list[int]] = {}
+        for lot_id, title in zip(lot_ids, titles):
+            for word in set(tokenize(title)):
+                words.setdefault(word, []).append(lot_id)
+        self.words = {w: array("q", p) for w, p in words.items()}
+
+        grams: dict[str, list[str]] = {}
+        for word in self.words:
+            for key in word_keys(word):
+                grams.setdefault(key, []).append(word)
+        self.grams = grams
+
+        # развороты повторяющихся фрагментов (листание одной выдачи) кешируются
+        self._expansion = lru_cache(maxsize=256)(self._expand)
+
+    def updated(self, changes: list[tuple[int, str, str]]) -> "TitleIndex":
+        """
+        Копия индекса с новыми заголовками лотов: changes — (lot_id, прежний
+        title, новый title), у нового лота прежний — "". Копируются только
+        списки затронутых слов; сам индекс не меняется.
+        """
+        add: dict[str, list[int]] = {}
+        remove: dict[str, list[int]] = {}
+        for lot_id, old, new in changes:
+            old_words, new_words = set(tokenize(old)), set(tokenize(new))
+            for word in old_words - new_words:
+                remove.setdefault(word, []).append(lot_id)
+            for word in new_words - old_words:
+                add.setdefault(word, []).append(lot_id)
+
+        index = TitleIndex()
+        index.words = dict(self.words)
+        index.grams = dict(self.grams)
+        for word in add.keys() | remove.keys():
+            posting = edit_posting(self.words.get(word, EMPTY), add.get(word, ()), remove.get(word, ()))
+            if len(posting):
+                index.words[word] = posting
+                if word not in self.words:
+                    for key in word_keys(word):
+                        index.grams[key] = index.grams.get(key, []) + [word]
+            elif word in self.words:
+                del index.words[word]
+                for key in word_keys(word):
+                    rest = [w for w in index.grams[key] if w != word]
+                    if rest:
+                        index.grams[key] = rest
+                    else:
+                        del index.grams[key]
+        return index
+
+    def _expand(self, token: str) -> tuple:
+        """
+        (точные, частичные) lot_id для токена: слово целиком и кортеж
+        списков слов, содержащих токен только как подстроку. Списки
+        не объединяются заранее — iter_intersect сливает их лениво.
+        """
+        buckets = [self.grams.get(k, ()) for k in gram_keys(token)]
+        candidates = min(buckets, key=len)
+        if len(token) < 3:
+            partial_words = [w for w in candidates if w.startswith(token) and w != token]
+        else:
+            partial_words = [w for w in candidates if token in w and w != token]
+
+        return self.words.get(token, EMPTY), tuple(self.words[w] for w in partial_words)
+
+    def match(self, query: str, tier: int, start: int, limit: int) -> list[tuple[int, int]]:
+        """
+        До limit пар (уровень, lot_id) в порядке ранжирования, начиная
+        с уровня tier и lot_id start. Внутри уровня — по возрастанию lot_id.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+        expansions = [self._expansion(t) for t in tokens]
+        exact = [e for e, _ in expansions]
+        hits = []
+
+        if tier >= TIER_EXACT:
+            if all(len(e) for e in exact):
+                for lot_id in islice(iter_intersect(exact, start), limit):
+                    hits.append((TIER_EXACT, lot_id))
+            start = 0
+
+        if len(hits) >= limit:
+            return hits
+
+        # частичный уровень: хотя бы один токен совпал не целым словом.
+        # Для каждого такого токена — свой поток, потоки сливаются по lot_id.
+        streams = []
+        for i, (_, partial) in enumerate(expansions):
+            if not partial:
+                continue
+            # остальные токены — слово целиком или как подстрока
+            others = [(e,) + p for j, (e, p) in enumerate(expansions) if j != i]
+            streams.append(iter_intersect([partial] + others, start))
+
+        for lot_id in _unique(heapq.merge(*streams)):
+            # лот с обеими формами слова уже выдан на точном уровне
+            if all(contains(e, lot_id) for e in exact):
+                continue
+            hits.append((TIER_PARTIAL, lot_id))
+            if len(hits) >= limit:
+                break
+        return hits
@@ -0,0 +1,122 @@
+import logging
+import multiprocessing as mp
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional
+
+from .columns import section_payload
+from .loader import read_lot_file
+
+logger = logging.getLogger(__name__)
+
+# при изменении формата section_payload — увеличить, старые снимки игнорируются
+SNAPSHOT_VERSION = 3
+
+
+def snapshot_path(cache_dir: Path, name: str) -> Path:
+    return cache_dir / f"{name}.lots.pickle"
+
+
+def read_snapshot(cache_dir: Path, name: str, signature: tuple[int, int]) -> Optional[dict]:
+    """
+    Снимок секции, если он построен из файла с той же подписью (mtime_ns, size).
+    Любая проблема со снимком — просто промах кеша.
+    """
+    path = snapshot_path(cache_dir, name)
+    try:
+        with open(path, "rb") as f:
+            snap = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Снимок {path.name} не читается, игнорируем: {e}")
+        return None
+    if snap.get("version") != SNAPSHOT_VERSION or tuple(snap.get("signature", ())) != signature:
+        return None
+    return snap["payload"]
+
+
+def write_snapshot(cache_dir: Path, name: str, signature: tuple[int, int], payload: dict):
+    """Пишет снимок атомарно: во временный файл и os.replace."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(cache_dir, name)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        pickle.dump(
+            {"version": SNAPSHOT_VERSION, "signature": signature, "payload": payload},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(tmp, path)
+
+
+def remove_snapshot(cache_dir: Path, name: str):
+    snapshot_path(cache_dir, name).unlink(missing_ok=True)
+
+
+def parse_section(path: str, name: str, signature: tuple[int, int], cache_dir: Optional[str]) -> dict:
+    """
+    Разбирает JSON секции в section_payload и, если задан cache_dir,
+    сохраняет снимок. Выполняется и в дочерних процессах.
+    """
+    lots, cursor, _ = read_lot_file(Path(path))
+    return section_result(lots, cursor, name, signature, cache_dir)
+
+
+def section_result(lots: list[dict], cursor, name: str, signature: tuple[int, int], cache_dir) -> dict:
+    """
+    section_payload прочитанных лотов плюс курсор NDJSON ("cursor" —
+    с него секция потом дочитывается) и, если задан cache_dir, снимок.
+    """
+    payload = section_payload(lots)
+    payload["cursor"] = cursor
+    if cache_dir:
+        try:
+            write_snapshot(Path(cache_dir), name, signature, payload)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить снимок секции {name}: {e}")
+    return payload
+
+
+def parse_sections(
+    jobs: dict[str, tuple[Path, tuple[int, int]]],
+    cache_dir: Optional[Path],
+    workers: int,
+) -> dict[str, object]:
+    """
+    Разбирает несколько секций: {имя: (путь, подпись)} → {имя: payload или исключение}.
+    JSON парсится под GIL, поэтому несколько файлов разбираются в пуле процессов;
+    одиночный файл (обычная горячая перезагрузка) — прямо в текущем процессе.
+    """
+    cache = str(cache_dir) if cache_dir else None
+    results: dict[str, object] = {}
+
+    if len(jobs) > 1 and workers > 1:
+        # spawn: форк процесса с потоками (uvicorn, наблюдатель) небезопасен
+        ctx = mp.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as pool:
+                futures = {
+                    name: pool.submit(parse_section, str(path), name, sig, cache)
+                    for name, (path, sig) in jobs.items()
+                }
+                for name, fut in futures.items():
+                    try:
+                        results[name] = fut.result()
+                    except (OSError, ValueError) as e:
+                        results[name] = e
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # пул не поднялся или упал — доразбираем оставшееся здесь
+            logger.warning(f"Пул разбора недоступен, продолжаем в одном процессе: {e}")
+
+    for name, (path, sig) in jobs.items():
+        if name in results:
+            continue
+        try:
+            results[name] = parse_section(str(path), name, sig, cache)
+        except (OSError, ValueError) as e:
+            results[name] = e
+    return results
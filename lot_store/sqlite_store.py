@@ -0,0 +1,403 @@
+import json
+import logging
+import queue
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from .encoding import encode_lot
+from .indexes import INDEXED_FIELDS
+from .loader import LOT_FIELDS, FileCursor, read_lot_file, scan_lot_files
+from .search import TIER_PARTIAL, tokenize
+from .stats import ACV_EDGES, ODOMETER_EDGES, LotStats, auction_day, bucket, parse_number
+from .store import BaseLotStore, LotSnapshot, signature_version
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ", ".join(LOT_FIELDS)
+# производные колонки для /cars/stats: корзины гистограмм и день аукциона
+_STAT_COLUMNS = ("acv_bucket", "odometer_bucket", "auction_day")
+_INSERT = (
+    f"INSERT OR REPLACE INTO lots (section, {_COLUMNS}, fragment, {', '.join(_STAT_COLUMNS)}, owner) "
+    f"VALUES (?, {', '.join('?' for _ in LOT_FIELDS)}, ?, ?, ?, ?, ?)"
+)
+# строки лота по секциям: секция, значения для LotStats.add_values (в порядке
+# её аргументов, row[1:7]) и title для поискового индекса
+_OWNERS = (
+    "SELECT section, damage, branch, fuel_type, auction_day, acv_bucket, odometer_bucket, title "
+    "FROM lots WHERE lot_id = ? ORDER BY section LIMIT 2"
+)
+# при изменении SCHEMA — увеличить: старые таблицы пересоздаются с нуля
+SCHEMA_VERSION = 6
+TABLES = ("lots", "sections", "section_stats", "titles")
+
+
+def _column_def(field: str) -> str:
+    if field == "lot_id":
+        return "lot_id INTEGER NOT NULL"
+    if field in INDEXED_FIELDS:
+        # фильтры сравниваются без учёта регистра — как в памяти
+        return f"{field} TEXT COLLATE NOCASE"
+    return f"{field} TEXT"
+
+
+SCHEMA = [
+    # один лот может встречаться в нескольких секциях — ключ (lot_id, section),
+    # чтобы удаление одной секции не уносило общие лоты другой
+    f"CREATE TABLE IF NOT EXISTS lots (section TEXT NOT NULL, "
+    f"{', '.join(_column_def(f) for f in LOT_FIELDS)}, "
+    # готовый JSON лота (encode_lot) — страницы собираются без кодирования
+    f"fragment BLOB NOT NULL, "
+    f"acv_bucket INTEGER, odometer_bucket INTEGER, auction_day TEXT, "
+    # 1 — строка видна в API: из секции с наименьшим именем, как в памяти
+    # (LotColumns.merge); страницы и поиск читают только такие строки
+    f"owner INTEGER NOT NULL DEFAULT 0, "
+    f"PRIMARY KEY (lot_id, section)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_lots_section ON lots(section)",
+    "CREATE INDEX IF NOT EXISTS ix_lots_owner ON lots(owner, lot_id)",
+    *(
+        f"CREATE INDEX IF NOT EXISTS ix_lots_{f} ON lots(owner, {f}, lot_id)"
+        for f in INDEXED_FIELDS
+    ),
+    # триграммный индекс title видимых лотов (rowid = lot_id) для /cars/search
+    "CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(title, tokenize='trigram')",
+    # подпись файла секции, из которого загружены её лоты, и курсор NDJSON
+    # (FileCursor; у JSON — NULL): дописанный файл дочитывается с offset
+    "CREATE TABLE IF NOT EXISTS sections ("
+    "name TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+    "ino INTEGER, offset INTEGER, head BLOB, edge BLOB)",
+    # LotStats секции (to_state в JSON) — агрегаты без GROUP BY по lots
+    "CREATE TABLE IF NOT EXISTS section_stats (name TEXT PRIMARY KEY, data TEXT NOT NULL)",
+]
+
+
+def _row(section: str, lot: dict, fragment: bytes) -> tuple:
+    return (
+        section,
+        *(lot.get(f) for f in LOT_FIELDS),
+        fragment,
+        bucket(parse_number(lot.get("acv")), ACV_EDGES),
+        bucket(parse_number(lot.get("odometer")), ODOMETER_EDGES),
+        auction_day(lot.get("auction_date")),
+    )
+
+
+class _StatsDelta:
+    """
+    Изменения агрегатов секций в одной транзакции загрузки.
+    Лот с одним lot_id в нескольких секциях учитывается один раз — в секции
+    с наименьшим именем (она же владелец строки); поэтому перед записью
+    и удалением строки агрегаты переносятся между секциями по владельцу,
+    а вместе с ними — флаг owner и title в поисковом индексе.
+    """
+
+    def __init__(self, current: dict[str, LotStats]):
+        self.current = current
+        self.touched: dict[str, LotStats] = {}
+
+    def _get(self, section: str) -> LotStats:
+        if section not in self.touched:
+            # копия: при откате транзакции агрегаты в памяти не тронуты
+            self.touched[section] = LotStats.combine(
+                [self.current[section]] if section in self.current else []
+            )
+        return self.touched[section]
+
+    def _add(self, row, sign: int):
+        self._get(row[0]).add_values(*row[1:7], sign=sign)
+
+    def write(self, db: sqlite3.Connection, row: tuple):
+        """INSERT OR REPLACE строки _row с переносом агрегатов и владельца."""
+        section, lot_id = row[0], row[1 + LOT_FIELDS.index("lot_id")]
+        owners = db.execute(_OWNERS, (lot_id,)).fetchall()
+        owner = not owners or owners[0]["section"] >= section
+        if owner:
+            if owners:
+                self._add(owners[0], -1)
+                if owners[0]["section"] != section:
+                    _set_owner(db, owners[0]["section"], lot_id, 0)
+            lot = dict(zip(LOT_FIELDS, row[1:]))
+            acv, odometer, day = row[-3:]
+            self._get(section).add_values(lot["damage"], lot["branch"], lot["fuel_type"], day, acv, odometer)
+            _index_title(db, lot_id, lot["title"])
+        db.execute(_INSERT, (*row, int(owner)))
+
+    def delete(self, db: sqlite3.Connection, section: str, lot_id: int):
+        owners = db.execute(_OWNERS, (lot_id,)).fetchall()
+        if owners and owners[0]["section"] == section:
+            self._add(owners[0], -1)
+            if len(owners) > 1:
+                self._add(owners[1], 1)
+                _set_owner(db, owners[1]["section"], lot_id, 1)
+                _index_title(db, lot_id, owners[1]["title"])
+            else:
+                db.execute("DELETE FROM titles WHERE rowid = ?", (lot_id,))
+        db.execute("DELETE FROM lots WHERE section = ? AND lot_id = ?", (section, lot_id))
+
+    def save(self, db: sqlite3.Connection):
+        for name, stats in self.touched.items():
+            if stats.total:
+                db.execute(
+                    "INSERT OR REPLACE INTO section_stats (name, data) VALUES (?, ?)",
+                    (name, json.dumps(stats.to_state())),
+                )
+            else:
+                db.execute("DELETE FROM section_stats WHERE name = ?", (name,))
+
+    def applied(self) -> dict[str, LotStats]:
+        """Агрегаты секций после коммита — новый словарь, старый не меняется."""
+        merged = {**self.current, **self.touched}
+        return {name: stats for name, stats in merged.items() if stats.total}
+
+
+def _set_owner(db: sqlite3.Connection, section: str, lot_id: int, owner: int):
+    db.execute("UPDATE lots SET owner = ? WHERE section = ? AND lot_id = ?", (owner, section, lot_id))
+
+
+def _index_title(db: sqlite3.Connection, lot_id: int, title: Optional[str]):
+    db.execute("INSERT OR REPLACE INTO titles (rowid, title) VALUES (?, ?)", (lot_id, title or ""))
+
+
+def _match_query(tokens: list[str]) -> str:
+    """Запрос FTS5: каждый токен — фраза (подстрока title для trigram), все через AND."""
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+
+
+def _like_pattern(token: str) -> str:
+    """%token% для LIKE ... ESCAPE '\\': % и _ в токене — обычные символы."""
+    escaped = token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL: читатели не блокируют запись и наоборот
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ConnectionPool:
+    """Фиксированный пул соединений для читающих запросов API."""
+
+    def __init__(self, path: Path, size: int = 4):
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            conn = connect(path)
+            conn.execute("PRAGMA query_only=1")
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class SqliteLotStore(BaseLotStore):
+    """
+    Лоты в индексированной таблице SQLite вместо списка в памяти.
+    Файлы секций загружаются в БД, только если изменились с прошлой
+    загрузки (подписи хранятся в самой БД), поэтому рестарт API не требует
+    разбора JSON. Запросы идут индексами через пул соединений.
+    """
+    backend = "sqlite"
+
+    def __init__(self, db_path: Path, data_dir: Path, interval: float = 5.0, pool_size: int = 4):
+        super().__init__(data_dir, interval)
+        self.db_path = db_path
+        self._writer = connect(db_path)
+        with self._writer:
+            version = self._writer.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                for table in TABLES:
+                    self._writer.execute(f"DROP TABLE IF EXISTS {table}")
+            for stmt in SCHEMA:
+                self._writer.execute(stmt)
+            self._writer.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.pool = ConnectionPool(db_path, pool_size)
+        # агрегаты секций заменяются целиком после коммита загрузки
+        self._section_stats: dict[str, LotStats] = {
+            name: LotStats.from_state(json.loads(data))
+            for name, data in self._writer.execute("SELECT name, data FROM section_stats")
+        }
+        self._stats: Optional[tuple[int, dict]] = None  # (generation, агрегаты)
+
+    def reload(self) -> bool:
+        """
+        Загружает в БД изменившиеся файлы секций и удаляет пропавшие.
+        Возвращает True, если таблица лотов изменилась.
+        """
+        with self._lock:
+            db = self._writer
+            files = scan_lot_files(self.data_dir)
+            signatures = {}
+            cursors = {}
+            for row in db.execute("SELECT * FROM sections"):
+                signatures[row["name"]] = (row["mtime_ns"], row["size"])
+                if row["ino"] is not None:
+                    cursors[row["name"]] = FileCursor(row["ino"], row["offset"], row["head"], row["edge"])
+            changed = False
+
+            for name in set(signatures) - set(files):
+                delta = _StatsDelta(self._section_stats)
+                with db:
+                    lot_ids = [row[0] for row in db.execute("SELECT lot_id FROM lots WHERE section = ?", (name,))]
+                    for lot_id in lot_ids:
+                        delta.delete(db, name, lot_id)
+                    db.execute("DELETE FROM sections WHERE name = ?", (name,))
+                    delta.save(db)
+                self._section_stats = delta.applied()
+                signatures.pop(name)
+                changed = True
+                logger.info(f"Секция {name} удалена")
+
+            for name, path in files.items():
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                sig = (st.st_mtime_ns, st.st_size)
+                if signatures.get(name) == sig:
+                    continue
+                try:
+                    # дописанный NDJSON читается только с курсора
+                    lots, cursor, tail = read_lot_file(path, cursors.get(name))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Не удалось прочитать {path.name}: {e}")
+                    continue
+                # секция обновляется по lot_id: пишутся только новые и изменившиеся
+                # лоты, пропавшие из файла удаляются — без пересборки всей секции;
+                # агрегаты секций правятся на те же лоты
+                delta = _StatsDelta(self._section_stats)
+                with db:
+                    if tail:
+                        # из дописанного файла лоты не пропадают — сверяем только хвост
+                        stored = {}
+                        for lot in lots:
+                            row = db.execute(
+                                "SELECT fragment FROM lots WHERE section = ? AND lot_id = ?",
+                                (name, lot["lot_id"]),
+                            ).fetchone()
+                            if row is not None:
+                                stored[lot["lot_id"]] = row[0]
+                    else:
+                        stored = dict(db.execute("SELECT lot_id, fragment FROM lots WHERE section = ?", (name,)))
+                    written = 0
+                    for lot in lots:
+                        fragment = encode_lot(lot)
+                        if stored.pop(lot["lot_id"], None) != fragment:
+                            delta.write(db, _row(name, lot, fragment))
+                            written += 1
+                    for lot_id in stored:
+                        delta.delete(db, name, lot_id)
+                    db.execute(
+                        "INSERT OR REPLACE INTO sections (name, mtime_ns, size, ino, offset, head, edge) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (name, *sig, *(cursor or (None, None, None, None))),
+                    )
+                    delta.save(db)
+                self._section_stats = delta.applied()
+                signatures[name] = sig
+                changed = changed or written > 0 or not tail
+                logger.info(
+                    f"Секция {name} {'дочитана' if tail else 'загружена'} в БД: {len(lots)} лотов, "
+                    f"записано {written}, удалено {len(stored)}"
+                )
+
+            # отпечаток берём из БД и при рестарте без изменений;
+            # снимок публикуется после коммита — с новым ETag отдаются уже новые данные
+            self._publish(None, signature_version(signatures), changed)
+            return changed
+
+    def _page_query(self, columns: str, last_id: int, limit: int, filters: Optional[dict[str, str]]):
+        where = ["owner = 1", "lot_id > ?"]
+        params: list = [last_id]
+        for field, value in (filters or {}).items():
+            if field not in INDEXED_FIELDS:
+                raise KeyError(field)
+            where.append(f"{field} = ?")
+            params.append(value.strip())
+        sql = f"SELECT {columns} FROM lots WHERE {' AND '.join(where)} ORDER BY lot_id LIMIT ?"
+        with self.pool.connection() as conn:
+            return conn.execute(sql, (*params, limit)).fetchall()
+
+    def page_fragments(
+        self,
+        last_id: int,
+        limit: int,
+        filters: Optional[dict[str, str]] = None,
+        snapshot: Optional[LotSnapshot] = None,
+    ):
+        # БД не старше снимка: в худшем случае под старым ETag уйдут новые данные
+        rows = self._page_query("lot_id, fragment", last_id, limit, filters)
+        if not rows:
+            return [], None
+        return [row["fragment"] for row in rows], rows[-1]["lot_id"]
+
+    def search(self, query: str, limit: int, cursor: Optional[tuple[int, int]] = None):
+        """
+        Упрощённый поиск: все слова запроса как подстроки title,
+        один уровень ранжирования, порядок по lot_id. Слова от трёх символов
+        ищутся триграммным индексом titles; короче — проверяются LIKE
+        по его кандидатам (если длинных слов нет — перебором titles).
+        На 500 тыс. лотов: 0,3–7 мс на избирательных словах, 20–30 мс на
+        широких, до 0,5 с на запросе только из коротких слов.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], None
+        _, last_id = cursor or (TIER_PARTIAL, 0)
+        long = [t for t in tokens if len(t) >= 3]
+        where = ["rowid > ?"]
+        params: list = [last_id]
+        if long:
+            where.append("titles MATCH ?")
+            params.append(_match_query(long))
+        for token in tokens:
+            if len(token) < 3:
+                where.append("title LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(token))
+        # сначала страница lot_id из индекса, потом строки по ключу: CROSS JOIN
+        # фиксирует порядок — иначе планировщик перебирает lots по lot_id > ?
+        sql = (
+            f"WITH hits AS MATERIALIZED (SELECT rowid AS lot_id FROM titles "
+            f"WHERE {' AND '.join(where)} ORDER BY rowid LIMIT ?) "
+            f"SELECT {', '.join('l.' + f for f in LOT_FIELDS)} FROM hits h "
+            f"CROSS JOIN lots l ON l.lot_id = h.lot_id AND l.owner = 1 ORDER BY h.lot_id"
+        )
+        with self.pool.connection() as conn:
+            lots = [dict(row) for row in conn.execute(sql, (*params, limit))]
+        if len(lots) < limit:
+            return lots, None
+        return lots, (TIER_PARTIAL, lots[-1]["lot_id"])
+
+    def stats(self, snapshot: Optional[LotSnapshot] = None) -> dict:
+        """
+        Сумма агрегатов секций (ведутся при загрузке) — без запросов к БД;
+        результат кешируется на поколение данных.
+        """
+        generation = (snapshot or self.snapshot).generation
+        if self._stats and self._stats[0] == generation:
+            return self._stats[1]
+
+        result = LotStats.combine(self._section_stats.values()).as_dict()
+        self._stats = (generation, result)
+        return result
+
+    def count(self) -> int:
+        # total агрегатов секций — счётчик, который ведётся при загрузке
+        return sum(stats.total for stats in self._section_stats.values())
+
+    def stop(self):
+        super().stop()
+        self.pool.close()
+        self._writer.close()
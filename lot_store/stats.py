@@ -0,0 +1,142 @@
+import re
+from bisect import bisect_right
+from collections import Counter
+from typing import Iterable, Optional
+
+# границы корзин гистограмм: [edges[i], edges[i + 1]), последняя — без верха
+ACV_EDGES = (0, 1000, 2500, 5000, 10000, 20000, 30000, 50000, 75000, 100000)
+ODOMETER_EDGES = (0, 10000, 25000, 50000, 75000, 100000, 150000, 200000, 250000)
+
+COUNT_FIELDS = ("damage", "branch", "fuel_type", "auction_day")
+UNKNOWN = "unknown"
+
+NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+DAY_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def parse_number(text) -> Optional[float]:
+    """'$12,345.00 USD' → 12345.0, '98,765 mi (Actual)' → 98765.0, 'N/A' → None"""
+    m = NUMBER_RE.search(str(text or ""))
+    return float(m.group(0).replace(",", "")) if m else None
+
+
+def bucket(value: Optional[float], edges: tuple) -> Optional[int]:
+    if value is None:
+        return None
+    return max(bisect_right(edges, value) - 1, 0)
+
+
+def auction_day(text) -> str:
+    """'2025-07-15 11:30:00' → '2025-07-15'; нераспознанная дата — unknown"""
+    m = DAY_RE.match(str(text or ""))
+    return m.group(0) if m else UNKNOWN
+
+
+class LotStats:
+    """
+    Агрегаты по набору лотов: счётчики по категориям и гистограммы.
+    Складываются и вычитаются, поэтому общие агрегаты собираются
+    из агрегатов секций за O(число корзин), без прохода по лотам.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.counts = {field: Counter() for field in COUNT_FIELDS}
+        self.acv = Counter()       # индекс корзины ACV_EDGES (None — не распознано)
+        self.odometer = Counter()  # индекс корзины ODOMETER_EDGES
+
+    def add_lot(self, lot: dict, sign: int = 1):
+        self.add_values(
+            lot.get("damage"),
+            lot.get("branch"),
+            lot.get("fuel_type"),
+            auction_day(lot.get("auction_date")),
+            bucket(parse_number(lot.get("acv")), ACV_EDGES),
+            bucket(parse_number(lot.get("odometer")), ODOMETER_EDGES),
+            sign,
+        )
+
+    def add_values(self, damage, branch, fuel_type, day: str, acv: Optional[int], odometer: Optional[int], sign: int = 1):
+        """Один лот по уже вычисленным значениям (день аукциона, корзины); sign=-1 — убрать."""
+        self.total += sign
+        for field, value in (("damage", damage), ("branch", branch), ("fuel_type", fuel_type), ("auction_day", day)):
+            _bump(self.counts[field], value or UNKNOWN, sign)
+        _bump(self.acv, acv, sign)
+        _bump(self.odometer, odometer, sign)
+
+    @classmethod
+    def from_lots(cls, lots: Iterable[dict]) -> "LotStats":
+        stats = cls()
+        for lot in lots:
+            stats.add_lot(lot)
+        return stats
+
+    def update(self, other: "LotStats", sign: int = 1):
+        """Прибавляет (sign=1) или вычитает (sign=-1) агрегаты other."""
+        self.total += sign * other.total
+        for field in COUNT_FIELDS:
+            _apply(self.counts[field], other.counts[field], sign)
+        _apply(self.acv, other.acv, sign)
+        _apply(self.odometer, other.odometer, sign)
+
+    @classmethod
+    def combine(cls, parts: Iterable["LotStats"]) -> "LotStats":
+        stats = cls()
+        for part in parts:
+            stats.update(part)
+        return stats
+
+    def to_state(self) -> dict:
+        """Состояние для JSON: счётчики парами [ключ, число] (ключи корзин — int или None)."""
+        return {
+            "total": self.total,
+            "counts": {field: list(self.counts[field].items()) for field in COUNT_FIELDS},
+            "acv": list(self.acv.items()),
+            "odometer": list(self.odometer.items()),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "LotStats":
+        stats = cls()
+        stats.total = state["total"]
+        for field in COUNT_FIELDS:
+            stats.counts[field] = Counter(dict(state["counts"][field]))
+        stats.acv = Counter(dict(state["acv"]))
+        stats.odometer = Counter(dict(state["odometer"]))
+        return stats
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "damage": _by_count(self.counts["damage"]),
+            "branch": _by_count(self.counts["branch"]),
+            "fuel_type": _by_count(self.counts["fuel_type"]),
+            "auction_day": dict(sorted(self.counts["auction_day"].items())),
+            "acv": _histogram(self.acv, ACV_EDGES),
+            "odometer": _histogram(self.odometer, ODOMETER_EDGES),
+        }
+
+
+def _bump(target: Counter, key, sign: int):
+    target[key] += sign
+    if target[key] <= 0:
+        del target[key]
+
+
+def _apply(target: Counter, source: Counter, sign: int):
+    for key, n in source.items():
+        target[key] += sign * n
+        if target[key] <= 0:
+            del target[key]
+
+
+def _by_count(counter: Counter) -> dict:
+    return dict(counter.most_common())
+
+
+def _histogram(counter: Counter, edges: tuple) -> dict:
+    buckets = []
+    for i, lo in enumerate(edges):
+        hi = edges[i + 1] if i + 1 < len(edges) else None
+        buckets.append({"from": lo, "to": hi, "count": counter.get(i, 0)})
+    return {"buckets": buckets, UNKNOWN: counter.get(None, 0)}
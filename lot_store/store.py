@@ -0,0 +1,286 @@
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from metrics import Counter, Histogram
+
+from .columns import LotColumns, new_categories
+from .dataset import LotDataset
+from .loader import FileCursor, read_lot_file, scan_lot_files
+from .snapshot import parse_sections, read_snapshot, remove_snapshot, section_result
+
+logger = logging.getLogger(__name__)
+
+RELOAD_SECONDS = Histogram(
+    "lot_store_reload_duration_seconds",
+    "Длительность проверки/перезагрузки файлов секций",
+    ["backend", "changed"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+RELOAD_ERRORS = Counter(
+    "lot_store_reload_errors",
+    "Сбои фоновой перезагрузки лотов",
+    ["backend"],
+)
+
+
+def signature_version(signatures: dict[str, tuple[int, int]]) -> str:
+    """
+    Короткий отпечаток набора файлов секций. Одинаков у всех воркеров
+    и переживает рестарт, пока файлы не менялись, — годится для ETag.
+    """
+    raw = repr(sorted(signatures.items())).encode()
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+class LotSnapshot(NamedTuple):
+    """
+    Согласованное состояние хранилища: данные, отпечаток файлов (для ETag)
+    и поколение (для кешей). Публикуется одной ссылкой — кто прочитал
+    store.snapshot один раз, получает все три из одной перезагрузки.
+    У SQLite dataset — None: данные в БД, а снимок публикуется после коммита.
+    """
+    dataset: object
+    version: str
+    generation: int
+
+
+class BaseLotStore:
+    """
+    Общая часть хранилищ: фоновый поток, который раз в interval секунд
+    вызывает reload() и подхватывает изменения файлов *_lots.json.
+    """
+    backend = ""
+
+    def __init__(self, data_dir: Path, interval: float = 5.0):
+        self.data_dir = data_dir
+        self.interval = interval
+        # generation растёт при каждом изменении набора лотов (инвалидация
+        # кешей процесса), version — отпечаток файлов, из которых он собран
+        self.snapshot = LotSnapshot(None, signature_version({}), 0)
+        self._lock = threading.Lock()  # одна перезагрузка за раз
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
+
+    def _publish(self, dataset, version: str, changed: bool):
+        """Новый снимок; поколение растёт, только если лоты изменились."""
+        current = self.snapshot
+        if changed or version != current.version:
+            self.snapshot = LotSnapshot(dataset, version, current.generation + int(changed))
+
+    def reload(self) -> bool:
+        raise NotImplementedError
+
+    def page_fragments(
+        self,
+        last_id: int,
+        limit: int,
+        filters: Optional[dict[str, str]] = None,
+        snapshot: Optional[LotSnapshot] = None,
+    ) -> tuple[list[bytes], Optional[int]]:
+        """
+        Страница готовым JSON лотов и lot_id последнего (None — пусто).
+        snapshot — снимок, из которого уже взяты ETag и ключ кеша.
+        """
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int, cursor: Optional[tuple[int, int]] = None):
+        raise NotImplementedError
+
+    def stats(self, snapshot: Optional[LotSnapshot] = None) -> dict:
+        """Агрегаты по всем лотам (см. LotStats.as_dict)."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Число лотов без сборки агрегатов — для /metrics."""
+        raise NotImplementedError
+
+    def refresh(self) -> bool:
+        """reload() с замером длительности для /metrics."""
+        start = time.perf_counter()
+        changed = self.reload()
+        RELOAD_SECONDS.labels(self.backend, "yes" if changed else "no").observe(
+            time.perf_counter() - start
+        )
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                RELOAD_ERRORS.labels(self.backend).inc()
+                logger.exception("Сбой фоновой перезагрузки лотов")
+
+    def start(self):
+        """Запускает фоновый поток наблюдения за папкой."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lot-store-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval + 1)
+            self._thread = None
+
+
+class LotStore(BaseLotStore):
+    """
+    Держит актуальный LotDataset в памяти. Перечитывает только
+    изменившиеся секции (по mtime/size) и атомарно подменяет снимок
+    (LotSnapshot с новым LotDataset). У дописанного NDJSON читается только
+    хвост, и его лоты вставляются в копию прежнего снимка без пересборки.
+    С cache_dir разобранные секции сохраняются бинарными снимками, и при
+    следующем старте JSON разбирается только для изменившихся файлов.
+    """
+    backend = "memory"
+
+    def __init__(
+        self,
+        data_dir: Path,
+        interval: float = 5.0,
+        cache_dir: Optional[Path] = None,
+        workers: int = 1,
+    ):
+        super().__init__(data_dir, interval)
+        self.cache_dir = cache_dir
+        self.workers = workers  # процессов для параллельного разбора JSON
+        self.categories = new_categories()
+        self.snapshot = LotSnapshot(LotDataset({}, self.categories), self.version, 0)
+        self._signatures: dict[str, tuple[int, int]] = {}  # секция → (mtime_ns, size)
+        self._sections: dict[str, LotColumns] = {}
+        self._cursors: dict[str, FileCursor] = {}  # секция NDJSON → докуда прочитана
+
+    def reload(self) -> bool:
+        """
+        Перечитывает изменившиеся файлы секций.
+        Возвращает True, если набор лотов изменился.
+        """
+        with self._lock:
+            files = scan_lot_files(self.data_dir)
+            sections = dict(self._sections)
+            signatures = dict(self._signatures)
+            cursors = dict(self._cursors)
+            rebuild = False  # секции заменены целиком — снимок собирается заново
+            appended = {}    # секция → лоты из дописанного хвоста NDJSON
+
+            for name in set(sections) - set(files):
+                sections.pop(name, None)
+                signatures.pop(name, None)
+                cursors.pop(name, None)
+                if self.cache_dir:
+                    remove_snapshot(self.cache_dir, name)
+                rebuild = True
+                logger.info(f"Секция {name} удалена")
+
+            jobs = {}
+            for name, path in files.items():
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                sig = (st.st_mtime_ns, st.st_size)
+                if signatures.get(name) == sig:
+                    continue
+                if name in cursors and name in sections:
+                    try:
+                        lots, cursor, tail = read_lot_file(path, cursors[name])
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Не удалось прочитать {path.name}: {e}")
+                        continue
+                    signatures[name] = sig
+                    if tail:
+                        cursors[name] = cursor
+                        appended[name] = lots
+                        continue
+                    # файл сжат (compact) или урезан — уже прочитан целиком
+                    payload = section_result(lots, cursor, name, sig, self.cache_dir)
+                    sections[name] = LotColumns.from_payload(payload, self.categories)
+                    self._track(cursors, name, payload)
+                    rebuild = True
+                    logger.info(f"Секция {name} перечитана: {len(sections[name])} лотов")
+                    continue
+                payload = read_snapshot(self.cache_dir, name, sig) if self.cache_dir else None
+                if payload is None:
+                    jobs[name] = (path, sig)
+                    continue
+                sections[name] = LotColumns.from_payload(payload, self.categories)
+                signatures[name] = sig
+                self._track(cursors, name, payload)
+                rebuild = True
+                logger.info(f"Секция {name} загружена из снимка: {len(sections[name])} лотов")
+
+            for name, result in parse_sections(jobs, self.cache_dir, self.workers).items():
+                if isinstance(result, Exception):
+                    # файл может быть недописан парсером — оставляем прежние
+                    # данные секции и пробуем снова на следующем проходе
+                    logger.warning(f"Не удалось прочитать {jobs[name][0].name}: {result}")
+                    continue
+                # словари лотов не хранятся: секция сразу в колонках,
+                # JSON каждого лота закодирован один раз
+                sections[name] = LotColumns.from_payload(result, self.categories)
+                signatures[name] = jobs[name][1]
+                self._track(cursors, name, result)
+                rebuild = True
+                logger.info(f"Секция {name} перечитана: {len(sections[name])} лотов")
+
+            changes = {}
+            for name, lots in appended.items():
+                sections[name], changes[name] = sections[name].upserted(lots, self.categories)
+                logger.info(f"Секция {name} дочитана: {len(lots)} лотов, изменилось {len(changes[name])}")
+            changed = rebuild or any(changes.values())
+
+            if rebuild:
+                dataset = LotDataset(sections, self.categories)
+            else:
+                dataset = self.dataset.upserted(sections, changes)
+            self._sections = sections
+            self._signatures = signatures
+            self._cursors = cursors
+            # хвост без новых лотов меняет только отпечаток файлов, не поколение
+            self._publish(dataset, signature_version(signatures), changed)
+            return changed
+
+    @staticmethod
+    def _track(cursors: dict[str, FileCursor], name: str, payload: dict):
+        # курсор есть только у NDJSON; у JSON-секции прежний (если был NDJSON) не нужен
+        if payload.get("cursor") is not None:
+            cursors[name] = payload["cursor"]
+        else:
+            cursors.pop(name, None)
+
+    @property
+    def dataset(self) -> LotDataset:
+        return self.snapshot.dataset
+
+    def page_fragments(
+        self,
+        last_id: int,
+        limit: int,
+        filters: Optional[dict[str, str]] = None,
+        snapshot: Optional[LotSnapshot] = None,
+    ):
+        return (snapshot or self.snapshot).dataset.page_fragments(last_id, limit, filters)
+
+    def search(self, query: str, limit: int, cursor: Optional[tuple[int, int]] = None):
+        return self.dataset.search(query, limit, cursor)
+
+    def stats(self, snapshot: Optional[LotSnapshot] = None) -> dict:
+        return (snapshot or self.snapshot).dataset.stats.as_dict()
+
+    def count(self) -> int:
+        return len(self.dataset)
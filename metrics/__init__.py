@@ -0,0 +1,25 @@
+from .registry import (
+    CONTENT_TYPE,
+    DEFAULT_BUCKETS,
+    Counter,
+    Family,
+    Gauge,
+    Histogram,
+    Registry,
+    REGISTRY,
+    histogram_samples,
+)
+from .asgi import RequestMetricsMiddleware
+
+__all__ = [
+    "CONTENT_TYPE",
+    "DEFAULT_BUCKETS",
+    "Counter",
+    "Family",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "RequestMetricsMiddleware",
+    "REGISTRY",
+    "histogram_samples",
+]
@@ -0,0 +1,47 @@
+import time
+
+from .registry import Counter, Histogram
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса до отправки последнего байта ответа",
+    ["route", "method"],
+)
+REQUESTS = Counter(
+    "http_requests",
+    "Запросы по маршрутам и кодам ответа",
+    ["route", "method", "status"],
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI-middleware: длительность и число запросов по шаблону маршрута
+    (/admin/logs/{log_name}, а не конкретный путь — метки не разрастаются).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_SECONDS.labels(path, method).observe(time.perf_counter() - start)
+            REQUESTS.labels(path, method, status).inc()
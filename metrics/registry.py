@@ -0,0 +1,245 @@
+import logging
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable, NamedTuple, Sequence
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Family(NamedTuple):
+    """Одна метрика в формате Prometheus: samples — (имя, метки, значение)."""
+    name: str
+    kind: str
+    help: str
+    samples: list[tuple[str, Labels, float]]
+
+
+def histogram_samples(
+    name: str,
+    labels: Labels,
+    buckets: Sequence[float],
+    counts: Sequence[int],
+    total: float,
+) -> list[tuple[str, Labels, float]]:
+    """
+    Сэмплы гистограммы из счётчиков по корзинам (counts[i] — попавшие
+    в (buckets[i-1], buckets[i]], последний — больше buckets[-1]).
+    """
+    samples = []
+    cumulative = 0
+    for le, n in zip(list(buckets) + [math.inf], counts):
+        cumulative += n
+        samples.append((f"{name}_bucket", labels + (("le", _number(le)),), cumulative))
+    samples.append((f"{name}_sum", labels, total))
+    samples.append((f"{name}_count", labels, cumulative))
+    return samples
+
+
+class _CounterValue:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("_lock", "buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class _Metric:
+    """
+    Метрика с метками. Запись — поиск дочернего значения в dict и короткий
+    неконкурентный lock этого значения; общего lock на запись нет,
+    он берётся только при появлении новой комбинации меток.
+    """
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_value())
+        return child
+
+    def _items(self):
+        with self._lock:
+            items = list(self._children.items())
+        for key, child in items:
+            yield tuple(zip(self.labelnames, key)), child
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def collect(self) -> Family:
+        name = f"{self.name}_total"
+        samples = [(name, labels, v.value) for labels, v in self._items()]
+        return Family(name, self.kind, self.help, samples)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_value(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def collect(self) -> Family:
+        samples = [(self.name, labels, v.value) for labels, v in self._items()]
+        return Family(self.name, self.kind, self.help, samples)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry=None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def collect(self) -> Family:
+        samples = []
+        for labels, v in self._items():
+            with v._lock:
+                counts, total = list(v.counts), v.sum
+            samples.extend(histogram_samples(self.name, labels, self.buckets, counts, total))
+        return Family(self.name, self.kind, self.help, samples)
+
+
+class Registry:
+    """
+    Набор метрик процесса. Помимо самих метрик можно зарегистрировать
+    collector — функцию, которая в момент опроса /metrics возвращает
+    готовые Family (размер датасета, прогресс парсера из файлов и т.п.).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def collect(self) -> Iterable[Family]:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        for metric in metrics:
+            yield metric.collect()
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                logger.exception(f"Сбой collector {collector!r}")
+                continue
+            yield from families
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples:
+                lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
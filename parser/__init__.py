@@ -1,4 +1,10 @@
 """
 Парсер IAAI
 """
-from .runner import main  # для удобного запуска через `import parser; parser.main()`
+
+def main():
+    # для удобного запуска через `import parser; parser.main()`;
+    # runner тянет selenium и прочее тяжёлое — импортируем только здесь,
+    # чтобы API мог читать parser.progress без этих зависимостей
+    from .runner import main as run
+    run()
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+from typing import Optional
+
+from .utils import write_json_atomic
+
+# Чекпойнты лежат рядом с выходными файлами, в скрытой подпапке:
+# /admin/clear-jsons их не трогает, а API не принимает их за секции
+CHECKPOINT_DIR = ".checkpoints"
+
+
+def checkpoint_path(output_dir: str, keyword: str) -> str:
+    return os.path.join(output_dir, CHECKPOINT_DIR, f"{keyword}.json")
+
+
+def index_path(output_dir: str, keyword: str) -> str:
+    """Журнал индекса lot_id → отпечаток NDJSON-раздела (LotIndex.flush)."""
+    return os.path.join(output_dir, CHECKPOINT_DIR, f"{keyword}.index")
+
+
+def read_checkpoint(output_dir: str, keyword: str) -> Optional[dict]:
+    try:
+        with open(checkpoint_path(output_dir, keyword), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_checkpoint(
+    output_dir: str,
+    keyword: str,
+    page: int,
+    pages_total: int,
+    session: int,
+    items: int,
+    data_path: str,
+    output_format: str,
+    index: Optional[dict] = None,
+) -> dict:
+    """
+    Записывает (атомарно) последнюю полностью сохранённую страницу.
+    bytes — размер файла данных в этот момент: по нему при рестарте видно,
+    соответствует ли файл чекпойнту. index — состояние журнала индекса
+    (LotIndex.flush/save), записанного до чекпойнта.
+    """
+    record = {
+        "page": page,
+        "pages_total": pages_total,
+        "session": session,
+        "items": items,
+        "bytes": os.path.getsize(data_path),
+        "format": output_format,
+        "index": index,
+        "updated_at": time.time(),
+    }
+    write_json_atomic(checkpoint_path(output_dir, keyword), record)
+    return record
+
+
+def restore_checkpoint(checkpoint: Optional[dict], data_path: str, output_format: str) -> bool:
+    """
+    Годится ли чекпойнт для продолжения без чтения файла данных.
+    NDJSON только дописывается: если после чекпойнта успели дописать
+    часть следующей страницы, файл обрезается ровно до чекпойнта и эта
+    страница будет скачана заново, без повторов. Файл JSON переписывается
+    целиком, поэтому его размер должен совпасть точно.
+    Файл удалён, стал короче или формат другой — False.
+    """
+    if not checkpoint or checkpoint.get("format") != output_format:
+        return False
+    try:
+        size = os.path.getsize(data_path)
+    except FileNotFoundError:
+        return False
+    expected = checkpoint["bytes"]
+    if output_format == "ndjson" and size > expected:
+        with open(data_path, "r+b") as f:
+            f.truncate(expected)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+    return size == expected
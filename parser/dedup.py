@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+from typing import Callable, Iterable, Optional
+
+from .utils import write_atomic
+
+# статусы upsert
+NEW, CHANGED, SAME = "new", "changed", "same"
+
+
+def lot_key(item: dict) -> Optional[str]:
+    """lot_id как ключ дедупликации; без валидного lot_id лот не схлопывается."""
+    key = item.get("lot_id")
+    if key in (None, "", "N/A"):
+        return None
+    return str(key)
+
+
+def unique_items(items: Iterable[dict]) -> list[dict]:
+    """Без повторов lot_id: последняя версия лота на месте первой."""
+    latest = {}
+    for item in items:
+        key = lot_key(item)
+        latest[key if key is not None else ("row", len(latest))] = item
+    return list(latest.values())
+
+
+def digest(item: dict) -> bytes:
+    """
+    Отпечаток лота: blake2b канонического JSON (ключи по порядку).
+    В отличие от hash() одинаков между запусками и процессами.
+    """
+    raw = json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def changed_fields(old: dict, new: dict) -> list[str]:
+    return sorted(k for k in old.keys() | new.keys() if old.get(k) != new.get(k))
+
+
+class LotIndex:
+    """
+    lot_id → (позиция лота в выходном файле, отпечаток лота).
+    upsert решает, что делать с лотом со страницы: новый — записать,
+    изменился — записать новую версию, тот же — пропустить.
+    append_only=True (NDJSON): новая версия дописывается в конец и позиция
+    переезжает; иначе (JSON-список) лот заменяется на своём месте.
+    """
+
+    def __init__(self, append_only: bool):
+        self.append_only = append_only
+        self.entries: dict[str, tuple[int, bytes]] = {}
+        self.size = 0  # позиций в файле (строк NDJSON / элементов списка)
+        self.seen = self.new = self.changed = self.same = 0
+        self.pending: list[str] = []  # ключи, изменённые после последнего flush
+
+    # Журнал индекса (NDJSON-раздел): строка [lot_id, позиция, отпечаток hex]
+    # на запись, последняя побеждает. Только дописывается — как и файл данных;
+    # длина журнала и size хранятся в чекпойнте (state), по ним индекс
+    # поднимается при рестарте без разбора всего файла данных.
+
+    def _journal_lines(self, keys: Iterable[str]):
+        for key in keys:
+            position, fingerprint = self.entries[key]
+            yield json.dumps([key, position, fingerprint.hex()], ensure_ascii=False).encode("utf-8") + b"\n"
+
+    def save(self, path: str) -> dict:
+        """Весь индекс в новый журнал (атомарно) — после сборки по файлу данных."""
+        write_atomic(path, self._journal_lines(list(self.entries)))
+        self.pending.clear()
+        return self._state(os.path.getsize(path))
+
+    def flush(self, path: str) -> dict:
+        """Дописывает в журнал записи с прошлого flush и делает fsync; state для чекпойнта."""
+        data = b"".join(self._journal_lines(dict.fromkeys(self.pending)))
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            nbytes = f.tell()
+        self.pending.clear()
+        return self._state(nbytes)
+
+    def _state(self, nbytes: int) -> dict:
+        return {"bytes": nbytes, "size": self.size, "entries": len(self.entries)}
+
+    @classmethod
+    def load(cls, path: str, state: Optional[dict]) -> Optional["LotIndex"]:
+        """
+        Индекс NDJSON-раздела из журнала по state из чекпойнта. Записи
+        после чекпойнта (упали между flush и чекпойнтом) отрезаются.
+        Журнала нет или он короче — None: индекс строится по файлу данных.
+        """
+        if not state:
+            return None
+        try:
+            with open(path, "r+b") as f:
+                data = f.read(state["bytes"])
+                if len(data) != state["bytes"]:
+                    return None
+                f.truncate(state["bytes"])
+        except FileNotFoundError:
+            return None
+        index = cls(append_only=True)
+        try:
+            for line in data.splitlines():
+                key, position, fingerprint = json.loads(line)
+                index.entries[key] = (position, bytes.fromhex(fingerprint))
+        except ValueError:
+            return None
+        # префикс журнала, пересобранного после этого чекпойнта, — не тот индекс
+        if len(index.entries) != state.get("entries"):
+            return None
+        index.size = state["size"]
+        return index
+
+    @classmethod
+    def build(cls, items: Iterable[dict], append_only: bool) -> "LotIndex":
+        index = cls(append_only)
+        for position, item in enumerate(items):
+            key = lot_key(item)
+            if key is not None:
+                index.entries[key] = (position, digest(item))
+            index.size = position + 1
+        return index
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def upsert(
+        self,
+        item: dict,
+        previous: Optional[Callable[[int], dict]] = None,
+    ) -> tuple[str, list[str], int]:
+        """
+        (статус, изменившиеся поля, позиция, куда писать лот).
+        Поля сравниваются, только если отпечаток другой и previous
+        (позиция → прежняя версия лота) задан; иначе их список пуст.
+        """
+        self.seen += 1
+        key = lot_key(item)
+        fingerprint = digest(item)
+        old = self.entries.get(key) if key is not None else None
+
+        if old is None:
+            status, changed = NEW, []
+        elif old[1] == fingerprint:
+            self.same += 1
+            return SAME, [], old[0]
+        else:
+            status = CHANGED
+            changed = changed_fields(previous(old[0]), item) if previous else []
+
+        if status == NEW or self.append_only:
+            position = self.size
+            self.size += 1
+        else:
+            position = old[0]
+        if key is not None:
+            self.entries[key] = (position, fingerprint)
+            if self.append_only:
+                self.pending.append(key)
+        if status == NEW:
+            self.new += 1
+        else:
+            self.changed += 1
+        return status, changed, position
+
+    def hit_rate(self) -> float:
+        """Доля лотов со страниц, которые уже были в файле (повтор или обновление)."""
+        return (self.same + self.changed) / self.seen if self.seen else 0.0
@@ -5,6 +5,9 @@ import math
 import tempfile
 import shutil
 import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
 
 import httpx
 from bs4 import BeautifulSoup
@@ -14,6 +17,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from .ratelimit import TokenBucket
 from .utils import random_xff
 
 # ——————————————————————————————————————————
@@ -143,6 +147,51 @@ class IaaIFetcher:
             "ShowRecommendations": False,
             "Sort": [{"IsGeoSort": False, "SortField": "AuctionDateTime", "IsDescending": False}],
         }
-        client.headers["X-Forwarded-For"] = random_xff()
-        resp = client.post("https://www.iaai.com/Search", json=payload)
+        # заголовок на запрос, а не в client.headers: клиент делят потоки fetch_pages
+        resp = client.post(
+            "https://www.iaai.com/Search",
+            json=payload,
+            headers={"X-Forwarded-For": random_xff()},
+        )
         return resp.text
+
+    def _fetch_limited(self, client: httpx.Client, page: int, limiter: Optional[TokenBucket]) -> str:
+        if limiter is not None:
+            limiter.acquire()
+        return self.fetch_page(client, page)
+
+    def fetch_pages(
+        self,
+        client: httpx.Client,
+        pages: Iterable[int],
+        concurrency: int,
+        limiter: Optional[TokenBucket] = None,
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Загружает страницы пулом потоков: в полёте до concurrency запросов,
+        частоту держит limiter (общий на порт прокси). Отдаёт (page, html)
+        строго в порядке pages, даже если ответы пришли вразнобой. Если
+        потребитель остановился (капча, сбой), невыполненные запросы отменяются.
+        """
+        pages = iter(pages)
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"fetch-{self.keyword}")
+        window = deque()
+
+        def submit() -> bool:
+            page = next(pages, None)
+            if page is None:
+                return False
+            window.append((page, pool.submit(self._fetch_limited, client, page, limiter)))
+            return True
+
+        try:
+            for _ in range(concurrency):
+                if not submit():
+                    break
+            while window:
+                page, future = window.popleft()
+                html = future.result()
+                submit()
+                yield page, html
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
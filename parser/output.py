@@ -0,0 +1,131 @@
+import os
+import json
+from typing import BinaryIO, Iterable, Iterator
+
+from .dedup import unique_items
+from .utils import write_atomic
+
+# Форматы выходного файла раздела:
+#   "ndjson" — {keyword}_lots.ndjson, по лоту на строку, страница дописывается в конец;
+#   "json"   — {keyword}_lots.json, весь список переписывается после каждой страницы
+OUTPUT_FORMATS = ("ndjson", "json")
+SUFFIXES = {"ndjson": "_lots.ndjson", "json": "_lots.json"}
+BLOCK_SIZE = 1024 * 1024
+
+
+def output_path(output_dir: str, keyword: str, output_format: str) -> str:
+    return os.path.join(output_dir, f"{keyword}{SUFFIXES[output_format]}")
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[tuple[int, dict]]:
+    """
+    (смещение конца строки, лот) из NDJSON построчно, начиная с offset,
+    без чтения файла целиком. Пустые, битые и не-объектные строки
+    пропускаются, недописанный хвост (парсер как раз пишет страницу) — тоже.
+    Единственный читатель NDJSON: им пользуются и парсер, и lot_store.
+    """
+    with open(path, "rb") as f:
+        yield from read_records(f, offset)
+
+
+def read_records(f: BinaryIO, offset: int = 0) -> Iterator[tuple[int, dict]]:
+    """iter_records по уже открытому файлу (чтобы сверить его же fstat)."""
+    f.seek(offset)
+    end = offset
+    for line in f:
+        if not line.endswith(b"\n"):
+            break  # хвост недописанной строки
+        end += len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(item, dict):
+            yield end, item
+
+
+def iter_items(path: str) -> Iterator[dict]:
+    """Лоты из NDJSON построчно (см. iter_records)."""
+    for _, item in iter_records(path):
+        yield item
+
+
+def repair(path: str) -> int:
+    """
+    Отрезает недописанный хвост (всё после последнего \\n — след
+    падения посреди записи) и возвращает число целых строк в файле.
+    """
+    if not os.path.exists(path):
+        return 0
+    lines = 0
+    end = 0  # смещение сразу после последнего \n
+    pos = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            n = block.count(b"\n")
+            if n:
+                lines += n
+                end = pos + block.rindex(b"\n") + 1
+            pos += len(block)
+    if end != pos:
+        with open(path, "r+b") as f:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+    return lines
+
+
+def append_items(path: str, items: Iterable[dict]) -> int:
+    """
+    Дописывает лоты страницы одним write и делает fsync — после возврата
+    страница гарантированно на диске. Возвращает число записанных байт.
+    """
+    data = b"".join(
+        json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n" for item in items
+    )
+    if not data:
+        return 0
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(data)
+
+
+def compact(path: str) -> int:
+    """
+    Переписывает NDJSON без повторов lot_id (остаётся последняя версия
+    лота на месте первой) и без битых строк. Подмена атомарная —
+    читатели видят либо старый файл, либо новый. Возвращает число лотов.
+    """
+    items = unique_items(iter_items(path))
+    return write_atomic(
+        path,
+        (json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n" for item in items),
+    )
+
+
+def migrate_json(json_path: str, ndjson_path: str) -> bool:
+    """
+    Если раздел раньше писался в {keyword}_lots.json, а NDJSON ещё нет —
+    переносит лоты в NDJSON. Старый файл не удаляется: API при обоих
+    файлах читает NDJSON, а JSON убирает runner после успешного compact().
+    """
+    if not os.path.exists(json_path) or os.path.exists(ndjson_path):
+        return False
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+    except json.JSONDecodeError:
+        items = []
+    write_atomic(
+        ndjson_path,
+        (json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n" for item in items),
+    )
+    return True
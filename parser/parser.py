@@ -1,71 +1,130 @@
 from bs4 import BeautifulSoup
+import os
 import re
-from datetime import datetime
+from typing import Optional
 from dateutil import parser as date_parser
 
-def parse_items(html: str) -> list[dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    cards = soup.select("div.table-cell--data.p-0")
+# Построитель дерева BeautifulSoup: "html.parser" (по умолчанию) или "lxml" —
+# заметно быстрее, но требует pip install lxml
+HTML_PARSER = os.environ.get("HTML_PARSER", "html.parser")
+
+# поле лота → подстрока title у span со значением (берётся первый такой span в строке)
+TITLE_KEYS = (
+    ("vin", "Please log in as a buyer"),
+    ("odometer", "Odometer"),
+    ("damage", "Primary Damage"),
+    ("run_and_drive", "Run & Drive"),
+    ("airbags", "Airbags"),
+    ("key", "Key"),
+    ("engine", "Engine"),
+    ("fuel_type", "Fuel Type"),
+    ("cylinders", "Cylinder"),
+    ("branch", "Branch"),
+    ("country", "Country"),
+    ("acv", "ACV"),
+)
+STOCK_TITLE = "Stock #:"
+AUCTION_CLASS = "table-cell-horizontal-center"
+# начало строки аукциона до конца timezone: "Tue Jul 15, 11:30am CDT"
+AUCTION_TIME_RE = re.compile(r'^(.*?(?:am|pm)\s*[A-Z]{2,4})', re.IGNORECASE)
+
+
+def _is_stock_value(span) -> bool:
+    # span.data-list__value внутри ul.data-list--search li.data-list__item
+    if "data-list__value" not in (span.get("class") or ()):
+        return False
+    li = span.find_parent("li", class_="data-list__item")
+    return li is not None and li.find_parent("ul", class_="data-list--search") is not None
+
+
+def scan_row(row) -> tuple[dict, Optional[str], Optional[str], Optional[str]]:
+    """
+    Один проход по строке выдачи вместо поиска по всему поддереву на каждое поле:
+    (поля по TITLE_KEYS, Stock #, data-src первой картинки, текст ячейки аукциона).
+    """
+    values = {}
+    pending = TITLE_KEYS
+    lot_id = preview = auction = None
+    for tag in row.descendants:
+        name = tag.name
+        if name == "span":
+            title = tag.get("title")
+            if not title:
+                continue
+            if lot_id is None and title.startswith(STOCK_TITLE) and _is_stock_value(tag):
+                lot_id = tag.text.strip()
+            if pending and any(key in title for _, key in pending):
+                text = tag.text.strip()
+                for field, key in pending:
+                    if key in title:
+                        values[field] = text
+                pending = tuple((field, key) for field, key in pending if key not in title)
+        elif name == "img":
+            if preview is None:
+                preview = tag.get("data-src", "N/A")
+        elif name == "div":
+            if auction is None and AUCTION_CLASS in (tag.get("class") or ()):
+                auction = tag.get_text(" ", strip=True)
+    return values, lot_id, preview, auction
+
+
+def auction_date(raw: str, cache: dict) -> str:
+    """
+    "Tue Jul 15, 11:30am CDTPre-BidView Sale List" → "YYYY-MM-DD HH:MM:SS".
+    На странице у лотов всего несколько разных дат — каждая разбирается один раз.
+    """
+    m = AUCTION_TIME_RE.match(raw)
+    if not m:
+        return raw
+    text = m.group(1)
+    if text not in cache:
+        try:
+            # разбираем дату, включая день недели, месяц, число, время и TZ-аббревиатуру
+            cache[text] = date_parser.parse(text).strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            cache[text] = None
+    # на случай непредвиденного формата — оставляем «как есть»
+    return cache[text] or raw
+
+
+def parse_items(html: str, features: Optional[str] = None) -> list[dict]:
+    return items_from_soup(BeautifulSoup(html, features or HTML_PARSER))
+
+
+def items_from_soup(soup) -> list[dict]:
+    """Лоты из готового дерева страницы выдачи."""
+    cards = [
+        div for div in soup.find_all("div", class_="table-cell--data")
+        if "p-0" in div["class"]
+    ]
     items = []
+    dates = {}
 
     for card in cards:
         a = card.find("a")
         if not a:
             continue
         row = card.find_parent("div", class_="table-row-inner")
-
-        def get_span(key: str) -> str:
-            tag = row.find("span", title=lambda t: t and key in t)
-            return tag.text.strip() if tag else "N/A"
-
-        title = a.text.strip()
-        link = "https://www.iaai.com" + a["href"]
-        vin = get_span("Please log in as a buyer")
-
-        # новое извлечение lot_id
-        stock_el = row.select_one(
-            "ul.data-list--search li.data-list__item "
-            "span.data-list__value[title^='Stock #:']"
-        )
-        lot_id = stock_el.text.strip() if stock_el else "N/A"
-
-        preview = (row.find("img") or {}).get("data-src", "N/A")
-        auc_date = (row.find("div", class_="table-cell-horizontal-center") or {}).get_text(strip=True)
-
-        # raw-строка вида "Tue Jul 15, 11:30am CDTPre-BidView Sale List"
-        raw = (row.find("div", class_="table-cell-horizontal-center") or {}).get_text(" ", strip=True)
-        # вырезаем всё до конца timezone (например "CDT")
-        m = re.match(r'^(.*?(?:am|pm)\s*[A-Z]{2,4})', raw, re.IGNORECASE)
-        if m:
-            try:
-                # разбираем дату, включая день недели, месяц, число, время и TZ-аббревиатуру
-                dt = date_parser.parse(m.group(1))
-                # форматируем в "YYYY-MM-DD HH:MM:SS"
-                auc_date = dt.strftime("%Y-%m-%d %H:%M:%S")
-            except Exception:
-            # на случай непредвиденного формата — оставляем «как есть»
-                auc_date = raw
-        else:
-            auc_date = raw
+        values, lot_id, preview, auction = scan_row(row)
 
         items.append({
-            "title": title,
-            "link": link,
-            "lot_id": lot_id,
-            "vin": vin,
-            "preview": preview,
-            "odometer": get_span("Odometer"),
-            "damage": get_span("Primary Damage"),
-            "run_and_drive": get_span("Run & Drive"),
-            "airbags": get_span("Airbags"),
-            "key": get_span("Key"),
-            "engine": get_span("Engine"),
-            "fuel_type": get_span("Fuel Type"),
-            "cylinders": get_span("Cylinder"),
-            "branch": get_span("Branch"),
-            "country": get_span("Country"),
-            "acv": get_span("ACV"),
-            "auction_date": auc_date,
+            "title": a.text.strip(),
+            "link": "https://www.iaai.com" + a["href"],
+            "lot_id": lot_id if lot_id is not None else "N/A",
+            "vin": values.get("vin", "N/A"),
+            "preview": preview if preview is not None else "N/A",
+            "odometer": values.get("odometer", "N/A"),
+            "damage": values.get("damage", "N/A"),
+            "run_and_drive": values.get("run_and_drive", "N/A"),
+            "airbags": values.get("airbags", "N/A"),
+            "key": values.get("key", "N/A"),
+            "engine": values.get("engine", "N/A"),
+            "fuel_type": values.get("fuel_type", "N/A"),
+            "cylinders": values.get("cylinders", "N/A"),
+            "branch": values.get("branch", "N/A"),
+            "country": values.get("country", "N/A"),
+            "acv": values.get("acv", "N/A"),
+            "auction_date": auction_date(auction if auction is not None else "", dates),
         })
 
     return items
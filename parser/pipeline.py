@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, Optional
+
+from .parser import parse_items
+
+_DONE = object()
+
+
+def is_captcha(html: str) -> bool:
+    lower = html.lower()
+    return "captcha" in lower or "incapsula" in lower
+
+
+def enrich_items(items: list[dict]) -> list[dict]:
+    """stock# из preview и ссылки на фото I1..I11 для каждого лота."""
+    for item in items:
+        # 1) вытаскиваем из preview URL параметр imageKeys, например "43142134~SID~I1"
+        preview_url = item.get("preview", "")
+        parsed = urllib.parse.urlparse(preview_url)
+        qs = urllib.parse.parse_qs(parsed.query)
+        image_keys = qs.get("imageKeys", [""])[0]  # "43142134~SID~I1"
+        stock = image_keys.split("~")[0]  # "43142134"
+        item["stock#"] = stock
+
+        # 2) генерируем ссылки I1..I11
+        item["photos"] = [
+            f"https://vis.iaai.com/resizer?imageKeys={stock}~SID~I{i}&width=1000&height=300"
+            for i in range(1, 12)
+        ]
+    return items
+
+
+def parse_page(html: str) -> tuple[list[dict], float]:
+    """Разбор страницы выдачи (выполняется и в процессах пула): лоты и время разбора."""
+    start = time.perf_counter()
+    items = enrich_items(parse_items(html))
+    return items, time.perf_counter() - start
+
+
+class PagePipeline:
+    """
+    Конвейер fetch → parse → write для одного раздела.
+      - fetch: отдельный поток тянет (page, html) из fetched и кладёт
+        в ограниченную очередь (fetch_queue) — если разбор не успевает,
+        загрузка ждёт, а не копит HTML в памяти;
+      - parse: пул из parse_workers процессов (0 — разбор в этом же
+        процессе, при выдаче), до parse_queue страниц в работе;
+      - write: потребитель итерирует конвейер и получает
+        (page, items, parse_seconds) строго по порядку страниц.
+    Капча отдаётся как (page, None, 0) после всех предыдущих страниц.
+    """
+
+    def __init__(
+        self,
+        fetched: Iterator[tuple[int, str]],
+        parse_workers: int = 0,
+        fetch_queue: int = 8,
+        parse_queue: int = 8,
+    ):
+        self._fetched = fetched
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, fetch_queue))
+        self._parse_queue = max(1, parse_queue)
+        self._pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+        self._window: deque = deque()
+        self._exhausted = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fetch, name="page-fetch", daemon=True)
+        self._thread.start()
+
+    def _put(self, entry) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch(self):
+        fetched = self._fetched
+        try:
+            for page, html in fetched:
+                if is_captcha(html):
+                    self._put((page, None))
+                    return
+                if not self._put((page, html)):
+                    return
+        except BaseException as e:
+            self._put((None, e))
+        finally:
+            fetched.close()
+            self._put(_DONE)
+
+    def _fill(self):
+        """Передаёт скачанные страницы в разбор, пока есть место в parse_queue."""
+        while not self._exhausted and len(self._window) < self._parse_queue:
+            try:
+                # пустое окно — ждём загрузку, иначе берём только готовое
+                entry = self._queue.get(block=not self._window)
+            except queue.Empty:
+                return
+            if entry is _DONE:
+                self._exhausted = True
+                return
+            page, html = entry
+            if page is None or html is None or self._pool is None:
+                # ошибка, капча или разбор при выдаче
+                self._window.append((page, html))
+                if page is None or html is None:
+                    self._exhausted = True
+                continue
+            self._window.append((page, self._pool.submit(parse_page, html)))
+
+    def __iter__(self) -> Iterator[tuple[int, Optional[list[dict]], float]]:
+        while True:
+            self._fill()
+            if not self._window:
+                return
+            page, job = self._window.popleft()
+            if page is None:
+                raise job
+            if job is None:
+                yield page, None, 0.0
+                return
+            if isinstance(job, Future):
+                items, seconds = job.result()
+            else:
+                items, seconds = parse_page(job)
+            yield page, items, seconds
+
+    def depths(self) -> dict[str, int]:
+        """Глубина очередей: скачано и ждёт разбора / в разборе и ждёт записи."""
+        return {"fetch": self._queue.qsize(), "parse": len(self._window)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._stop.set()
+        # разблокировать поток загрузки, если он ждёт места в очереди
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        for _, job in self._window:
+            if isinstance(job, Future):
+                job.cancel()
+        self._window.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._thread.join(timeout=5)
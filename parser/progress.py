@@ -0,0 +1,176 @@
+import os
+import json
+import time
+from bisect import bisect_left
+from typing import Optional
+
+from .utils import write_json_atomic
+
+# Папка со статусами секций внутри parser/ — по файлу на раздел
+BASE_DIR = os.path.dirname(__file__)
+STATUS_DIR = os.path.join(BASE_DIR, "status")
+# раздел ещё работает; иначе — "done" или "failed"
+ACTIVE_STATES = ("starting", "running", "restarting")
+# корзины гистограмм для /metrics (верхние границы, последняя корзина — больше)
+PARSE_SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ITEMS_PER_PAGE_BUCKETS = (0, 10, 25, 50, 75, 100, 200, 500)
+
+
+def _histogram(buckets) -> dict:
+    return {"counts": [0] * (len(buckets) + 1), "sum": 0}
+
+
+def _observe(hist: dict, buckets, value):
+    hist["counts"][bisect_left(buckets, value)] += 1
+    hist["sum"] += value
+
+
+def status_path(keyword: str, status_dir: str = STATUS_DIR) -> str:
+    return os.path.join(status_dir, f"{keyword}.json")
+
+
+def clear_status(status_dir: str = STATUS_DIR) -> None:
+    """Удаляет статусы прошлого запуска."""
+    if not os.path.isdir(status_dir):
+        return
+    for name in os.listdir(status_dir):
+        if name.endswith(".json"):
+            try:
+                os.remove(os.path.join(status_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+class SectionProgress:
+    """
+    Прогресс одного раздела для /admin/parser-status.
+    Каждый раздел крутится в своём процессе и пишет только свой файл,
+    целиком и атомарно (tmp + os.replace) — читатель никогда не видит
+    недописанный JSON, а блокировки между процессами не нужны.
+    """
+
+    def __init__(self, keyword: str, status_dir: str = STATUS_DIR):
+        self.path = status_path(keyword, status_dir)
+        now = time.time()
+        self.data = {
+            "keyword": keyword,
+            "pid": os.getpid(),
+            "state": "starting",
+            "page": None,          # последняя обработанная страница
+            "pages_total": None,
+            "pages_fetched": 0,    # страниц скачано за этот запуск (со всеми рестартами)
+            "lots": 0,             # лотов в выходном файле
+            "lots_fetched": 0,     # лотов получено за этот запуск
+            "retries": 0,
+            "captcha_restarts": 0,
+            "bytes_written": 0,
+            "parse_seconds": _histogram(PARSE_SECONDS_BUCKETS),
+            "items_per_page": _histogram(ITEMS_PER_PAGE_BUCKETS),
+            "queues": {"fetch": 0, "parse": 0},  # глубина очередей конвейера после страницы
+            "last_error": None,
+            "started_at": now,
+            "fetch_started_at": None,  # первая поднятая сессия — от неё считаем скорость
+            "updated_at": now,
+        }
+        self._write()
+
+    def _write(self):
+        self.data["updated_at"] = time.time()
+        write_json_atomic(self.path, self.data)
+
+    def session(self, pages_total: int, lots: int):
+        """Сессия поднята: известно число страниц и сколько лотов уже есть."""
+        if self.data["fetch_started_at"] is None:
+            self.data["fetch_started_at"] = time.time()
+        self.data.update(state="running", pages_total=pages_total, lots=lots)
+        self._write()
+
+    def page_done(
+        self,
+        page: int,
+        found: int,
+        lots: int,
+        parse_seconds: float = 0.0,
+        written: int = 0,
+        queues: Optional[dict] = None,
+    ):
+        self.data["page"] = page
+        self.data["pages_fetched"] += 1
+        self.data["lots_fetched"] += found
+        self.data["lots"] = lots
+        self.data["bytes_written"] += written
+        if queues is not None:
+            self.data["queues"] = queues
+        _observe(self.data["parse_seconds"], PARSE_SECONDS_BUCKETS, parse_seconds)
+        _observe(self.data["items_per_page"], ITEMS_PER_PAGE_BUCKETS, found)
+        self._write()
+
+    def captcha(self, page: int):
+        self.data["captcha_restarts"] += 1
+        self.data["last_error"] = f"captcha on page {page}"
+        self._write()
+
+    def retry(self, error: BaseException):
+        self.data["retries"] += 1
+        self.data["state"] = "restarting"
+        self.data["last_error"] = f"{type(error).__name__}: {error}"
+        self._write()
+
+    def finish(self, state: str = "done", error: Optional[BaseException] = None):
+        self.data["state"] = state
+        if error is not None:
+            self.data["last_error"] = f"{type(error).__name__}: {error}"
+        self._write()
+
+
+def pid_alive(pid) -> bool:
+    """
+    Жив ли процесс раздела (pid из его статуса). Раздел мог быть запущен
+    из CLI или пережить рестарт API (runner стартует через setsid), поэтому
+    Popen в памяти API для этого не годится.
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # процесс есть, но чужой
+    return True
+
+
+def read_status(status_dir: str = STATUS_DIR, now: Optional[float] = None) -> list[dict]:
+    """
+    Статусы всех разделов плюс производные поля: pages_per_sec и lots_per_sec
+    (по времени с первой поднятой сессии, рестарты входят) и eta_sec
+    до последней страницы.
+    """
+    if not os.path.isdir(status_dir):
+        return []
+    now = time.time() if now is None else now
+    sections = []
+    for name in sorted(os.listdir(status_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(status_dir, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+
+        pages_per_sec = lots_per_sec = eta = None
+        first = data.get("fetch_started_at")
+        if first is not None and data.get("pages_fetched"):
+            end = now if data["state"] in ACTIVE_STATES else data["updated_at"]
+            elapsed = max(end - first, 1e-6)
+            pages_per_sec = data["pages_fetched"] / elapsed
+            lots_per_sec = data["lots_fetched"] / elapsed
+            if data.get("pages_total") and data.get("page") is not None and data["state"] in ACTIVE_STATES:
+                left = max(data["pages_total"] - data["page"], 0)
+                eta = left / pages_per_sec
+        data["pages_per_sec"] = pages_per_sec
+        data["lots_per_sec"] = lots_per_sec
+        data["eta_sec"] = eta
+        sections.append(data)
+    return sections
@@ -0,0 +1,47 @@
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket для потоков: в среднем rate запросов в секунду,
+    всплеск до burst. acquire() блокирует поток до появления токена.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: dict[int, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def proxy_limiter(proxy_port: int, rate: float, burst: int) -> Optional[TokenBucket]:
+    """
+    Общий на процесс TokenBucket порта прокси: все загрузки через этот
+    порт делят один лимит. rate <= 0 — без ограничения.
+    """
+    if rate <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(proxy_port)
+        if bucket is None:
+            bucket = _buckets[proxy_port] = TokenBucket(rate, max(1, burst))
+        return bucket
@@ -3,8 +3,8 @@ import json
 import time
 import logging
 import tempfile
-import urllib.parse
 import multiprocessing as mp
+from typing import Optional
 from multiprocessing import Process, Queue
 
 from httpx import ProxyError
@@ -12,7 +12,15 @@ from urllib3.exceptions import ProtocolError
 from selenium.common.exceptions import NoSuchWindowException
 
 from .fetcher import IaaIFetcher
-from .parser import parse_items
+from .pipeline import PagePipeline
+from .output import (
+    OUTPUT_FORMATS, append_items, compact, iter_items, migrate_json, repair,
+    output_path as section_output_path,
+)
+from .progress import SectionProgress, clear_status
+from .dedup import LotIndex, NEW, CHANGED, unique_items
+from .checkpoint import index_path, read_checkpoint, restore_checkpoint, write_checkpoint
+from .ratelimit import proxy_limiter
 from .utils import sleep_random
 
 # Папка для логов внутри parser/
@@ -37,14 +45,40 @@ def setup_logger(keyword: str) -> logging.Logger:
         logger.addHandler(fh)
     return logger
 
+def fetch_sequential(fetcher: IaaIFetcher, client, pages, dyn_pages: int, logger: logging.Logger):
+    """Страницы по одной со случайной паузой 2–5 с между запросами."""
+    for i, page in enumerate(pages):
+        if i:
+            sleep_random(2, 5)
+        logger.info(f"Запрос страницы {page}/{dyn_pages}")
+        yield page, fetcher.fetch_page(client, page)
+
 def process_section(
     keyword: str,
     proxy_port: int,
     output_dir: str,
     start_page: int,
     page_size: int,
-    logger: logging.Logger
+    logger: logging.Logger,
+    progress: Optional[SectionProgress] = None,
+    output_format: str = "ndjson",
+    session: int = 1,
+    saved: Optional[int] = None,
+    page_concurrency: int = 1,
+    proxy_rate: float = 0.0,
+    parse_workers: int = 0,
+    pipeline_queue: int = 8
 ) -> int:
+    """
+    Обходит страницы start_page..N раздела. saved — сколько лотов уже
+    в файле (из чекпойнта, файл сверен с ним); без него NDJSON сначала
+    чинится. Лоты со страниц сверяются с индексом lot_id: в файл попадают
+    только новые и изменившиеся. После каждой сохранённой страницы пишется чекпойнт.
+    page_concurrency > 1 — страницы качаются параллельно (не чаще proxy_rate
+    запросов/сек на порт прокси), но обрабатываются и пишутся по порядку.
+    Загрузка, разбор (parse_workers процессов) и запись идут конвейером
+    (PagePipeline) с очередями до pipeline_queue страниц между стадиями.
+    """
     fetcher = IaaIFetcher(keyword, page_size=page_size, proxy_port=proxy_port)
     dyn_pages = fetcher.start_session()
     logger.info(f"Динамическое число страниц: {dyn_pages}")
@@ -54,91 +88,218 @@ def process_section(
 
     client = fetcher.build_client()
     os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"{keyword}_lots.json")
+    output_path = section_output_path(output_dir, keyword, output_format)
+    ndjson = output_format == "ndjson"
 
     # загружаем уже собранное, если есть
-    if os.path.exists(output_path):
-        try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                all_items = json.load(f)
-        except json.JSONDecodeError:
-            all_items = []
+    all_items = []
+    if ndjson:
+        # лоты в памяти не держим: файл только дописывается, индекс — из журнала
+        # рядом с чекпойнтом; весь файл читаем, только если чекпойнт не совпал
+        if saved is None:
+            repair(output_path)
+        open(output_path, "ab").close()
+        journal = index_path(output_dir, keyword)
+        checkpoint = read_checkpoint(output_dir, keyword) if saved is not None else None
+        index = None
+        if checkpoint and checkpoint.get("bytes") == os.path.getsize(output_path):
+            index = LotIndex.load(journal, checkpoint.get("index"))
+        if index is None:
+            index = LotIndex.build(iter_items(output_path), append_only=True)
+            journal_state = index.save(journal)
+            logger.info(f"Индекс дедупликации построен по {output_path}: {len(index)} лотов")
+        else:
+            journal_state = checkpoint["index"]
+            logger.info(f"Индекс дедупликации загружен из {journal}: {len(index)} лотов")
     else:
-        all_items = []
-
-    for page in range(start_page, dyn_pages + 1):
-        logger.info(f"Запрос страницы {page}/{dyn_pages}")
-        html = fetcher.fetch_page(client, page)
-
-        if "captcha" in html.lower() or "incapsula" in html.lower():
-            logger.warning(f"Капча на странице {page}, перезапуск сессии")
-            raise RuntimeError("Captcha detected")
-
-        items = parse_items(html)
-        logger.info(f"Страница {page}: найдено {len(items)} лотов")
-
-        # —————————————————————
-        # ВЫЧИСЛЯЕМ stock# и photos
-        for item in items:
-            # 1) вытаскиваем из preview URL параметр imageKeys, например "43142134~SID~I1"
-            preview_url = item.get("preview", "")
-            parsed = urllib.parse.urlparse(preview_url)
-            qs = urllib.parse.parse_qs(parsed.query)
-            image_keys = qs.get("imageKeys", [""])[0]  # "43142134~SID~I1"
-            stock = image_keys.split("~")[0]  # "43142134"
-            item["stock#"] = stock
-
-            # 2) генерируем 13 ссылок I1..I13
-            item["photos"] = [
-                f"https://vis.iaai.com/resizer?imageKeys={stock}~SID~I{i}&width=1000&height=300"
-                for i in range(1, 12)
-            ]
-        # —————————————————————
-
-        all_items.extend(items)
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(all_items, f, ensure_ascii=False, indent=2)
-        logger.info(f"Сохранено {len(all_items)} лотов → {output_path}")
-
-        sleep_random(2, 5)
+        if os.path.exists(output_path):
+            try:
+                with open(output_path, "r", encoding="utf-8") as f:
+                    all_items = unique_items(json.load(f))
+            except json.JSONDecodeError:
+                all_items = []
+        index = LotIndex.build(all_items, append_only=False)
+    saved = len(index)
+
+    if progress:
+        progress.session(dyn_pages, saved)
+
+    pages = range(start_page, dyn_pages + 1)
+    if page_concurrency > 1:
+        limiter = proxy_limiter(proxy_port, proxy_rate, page_concurrency)
+        logger.info(
+            f"Параллельная загрузка: до {page_concurrency} страниц, "
+            f"{proxy_rate or 'без лимита'} запросов/сек на порт {proxy_port}"
+        )
+        fetched = fetcher.fetch_pages(client, pages, page_concurrency, limiter)
+    else:
+        fetched = fetch_sequential(fetcher, client, pages, dyn_pages, logger)
+
+    # при капче/сбое оставшиеся загрузки и разборы отменяются сразу
+    with PagePipeline(fetched, parse_workers, pipeline_queue, pipeline_queue) as pipeline:
+        for page, items, parse_seconds in pipeline:
+            if items is None:
+                logger.warning(f"Капча на странице {page}, перезапуск сессии")
+                if progress:
+                    progress.captcha(page)
+                raise RuntimeError("Captcha detected")
+
+            logger.info(f"Страница {page}: найдено {len(items)} лотов")
+
+            # upsert: свежая версия побеждает, повторы без изменений не пишем
+            fresh = []
+            new = changed = 0
+            # прежние версии под рукой только у JSON-списка; NDJSON в памяти не держим
+            previous = None if ndjson else all_items.__getitem__
+            for item in items:
+                status, fields, position = index.upsert(item, previous)
+                if status == NEW:
+                    new += 1
+                elif status == CHANGED:
+                    changed += 1
+                    logger.debug(f"Лот {item.get('lot_id')} изменился: {', '.join(fields) or 'новая версия'}")
+                else:
+                    continue
+                fresh.append(item)
+                if not ndjson:
+                    if position < len(all_items):
+                        all_items[position] = item
+                    else:
+                        all_items.append(item)
+            logger.info(
+                f"Страница {page}: новых {new}, изменённых {changed}, "
+                f"повторов {len(items) - new - changed}; доля повторов за сессию {index.hit_rate():.1%}"
+            )
+
+            written = 0
+            if ndjson:
+                # дописываем только новые и изменённые лоты, fsync на границе страницы;
+                # журнал индекса — до чекпойнта, который фиксирует длины обоих файлов
+                written = append_items(output_path, fresh)
+                journal_state = index.flush(journal)
+            elif fresh or not os.path.exists(output_path):
+                with open(output_path, "w", encoding="utf-8") as f:
+                    json.dump(all_items, f, ensure_ascii=False, indent=2)
+                written = os.path.getsize(output_path)
+            saved = len(index)
+            logger.info(f"Сохранено {saved} лотов → {output_path}")
+            write_checkpoint(
+                output_dir, keyword, page, dyn_pages, session, saved, output_path, output_format,
+                journal_state if ndjson else None,
+            )
+            depths = pipeline.depths()
+            logger.info(f"Очереди: скачано и ждёт разбора {depths['fetch']}, в разборе {depths['parse']}")
+            if progress:
+                progress.page_done(page, len(items), saved, parse_seconds, written, depths)
 
     logger.info(f"🎉 Все страницы ({dyn_pages}) обработаны.")
+    logger.info(
+        f"Дедупликация за сессию: со страниц {index.seen} лотов, новых {index.new}, "
+        f"обновлено {index.changed}, повторов без изменений {index.same} "
+        f"(попаданий в индекс {index.hit_rate():.1%})"
+    )
+    if ndjson:
+        # повторы страниц после рестартов и недописанные строки — вон
+        lots = compact(output_path)
+        logger.info(f"Файл {output_path} сжат: {lots} лотов")
+        # позиции после сжатия другие — журнал индекса сбрасываем
+        if os.path.exists(journal):
+            os.remove(journal)
+        # перенесённый migrate_json старый JSON больше не нужен
+        legacy = section_output_path(output_dir, keyword, "json")
+        if os.path.exists(legacy):
+            os.remove(legacy)
+            logger.info(f"Старый файл {legacy} удалён")
+        write_checkpoint(output_dir, keyword, dyn_pages, dyn_pages, session, lots, output_path, output_format)
     return dyn_pages
 
+def saved_count(output_path: str, output_format: str) -> Optional[int]:
+    """Сколько лотов уже в файле раздела; None — JSON битый."""
+    if output_format == "ndjson":
+        # недописанная при падении строка отрезается, целые страницы остаются
+        return repair(output_path)
+    if not os.path.exists(output_path):
+        return 0
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            return len(json.load(f))
+    except json.JSONDecodeError:
+        return None
+
+def resume_position(
+    output_dir: str,
+    keyword: str,
+    output_format: str,
+    page_size: int,
+    logger: logging.Logger
+) -> tuple[int, Optional[int], int]:
+    """
+    Откуда продолжать раздел: (стартовая страница, лотов в файле, номер
+    последней сессии). По чекпойнту — за O(1) и точно; если его нет или файл
+    с ним не сходится — по старинке, по числу лотов в файле.
+    """
+    output_path = section_output_path(output_dir, keyword, output_format)
+    checkpoint = read_checkpoint(output_dir, keyword)
+    session = checkpoint.get("session", 0) if checkpoint else 0
+    if restore_checkpoint(checkpoint, output_path, output_format):
+        start_page = checkpoint["page"] + 1
+        logger.info(
+            f"Чекпойнт: страница {checkpoint['page']}/{checkpoint['pages_total']}, "
+            f"{checkpoint['items']} лотов, старт с {start_page}"
+        )
+        return start_page, checkpoint["items"], session
+    if checkpoint:
+        logger.warning(f"Чекпойнт не совпадает с {output_path}, считаем по числу лотов")
+
+    saved = saved_count(output_path, output_format)
+    if saved is None:
+        logger.warning(f"Файл {output_path} битый, стартуем с 1")
+        return 1, None, session
+    if saved:
+        start_page = saved // page_size + 1
+        logger.info(f"Найден существующий файл, старт с {start_page}")
+        return start_page, saved, session
+    return 1, saved, session
+
 def run_section_with_restart(
     keyword: str,
     proxy_port: int,
     output_dir: str,
     page_size: int,
-    max_retries: int = 5
+    max_retries: int = 5,
+    output_format: str = "ndjson",
+    page_concurrency: int = 1,
+    proxy_rate: float = 0.0,
+    parse_workers: int = 0,
+    pipeline_queue: int = 8
 ) -> str:
     logger = setup_logger(keyword)
-    output_path = os.path.join(output_dir, f"{keyword}_lots.json")
+    progress = SectionProgress(keyword)
+    output_path = section_output_path(output_dir, keyword, output_format)
+    if output_format == "ndjson":
+        legacy = section_output_path(output_dir, keyword, "json")
+        if migrate_json(legacy, output_path):
+            logger.info(f"Файл {legacy} перенесён в {output_path}")
 
     # определяем стартовую страницу
-    if os.path.exists(output_path):
-        try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                current = json.load(f)
-            done_pages = len(current) // page_size
-            start_page = done_pages + 1
-            logger.info(f"Найден существующий файл, старт с {start_page}")
-        except json.JSONDecodeError:
-            start_page = 1
-            logger.warning(f"Файл {output_path} битый, стартуем с 1")
-    else:
-        start_page = 1
+    start_page, saved, session = resume_position(output_dir, keyword, output_format, page_size, logger)
 
     attempts = 0
     while True:
+        session += 1
         try:
-            process_section(keyword, proxy_port, output_dir, start_page, page_size, logger)
+            process_section(
+                keyword, proxy_port, output_dir, start_page, page_size, logger, progress,
+                output_format, session, saved, page_concurrency, proxy_rate,
+                parse_workers, pipeline_queue
+            )
+            progress.finish()
             break
 
         except ProxyError as e:
             logger.error(f"ProxyError на разделе «{keyword}»: {e}")
             logger.error("Прокси требует аутентификацию — прекращаем.")
+            progress.finish("failed", e)
             break
 
         except (ProtocolError, NoSuchWindowException) as e:
@@ -146,8 +307,12 @@ def run_section_with_restart(
             logger.error(f"{type(e).__name__} на разделе «{keyword}»: {e}")
             if attempts >= max_retries:
                 logger.error(f"Превышено {max_retries} попыток перезапуска для «{keyword}», выходим.")
+                progress.finish("failed", e)
                 break
-            logger.info(f"Попытка {attempts}/{max_retries} после сбоя, рестарт через 5 сек")
+            progress.retry(e)
+            start_page, saved, last_session = resume_position(output_dir, keyword, output_format, page_size, logger)
+            session = max(session, last_session)
+            logger.info(f"Попытка {attempts}/{max_retries} после сбоя, рестарт с {start_page} через 5 сек")
             time.sleep(5)
             continue
 
@@ -156,26 +321,38 @@ def run_section_with_restart(
             logger.exception(f"Сбой на странице {start_page}: {e}")
             if attempts >= max_retries:
                 logger.error(f"Превышено {max_retries} попыток перезапуска для «{keyword}», выходим.")
+                progress.finish("failed", e)
                 break
+            progress.retry(e)
             # пересчёт текущей страницы
-            if os.path.exists(output_path):
-                try:
-                    with open(output_path, "r", encoding="utf-8") as f:
-                        current = json.load(f)
-                    done_pages = len(current) // page_size if current else 0
-                    start_page = done_pages + 1
-                except json.JSONDecodeError:
-                    start_page = 1
-            else:
-                start_page = 1
+            start_page, saved, last_session = resume_position(output_dir, keyword, output_format, page_size, logger)
+            session = max(session, last_session)
             logger.info(f"Попытка {attempts}/{max_retries}. Рестарт с {start_page} через 5 сек")
             time.sleep(5)
 
     return output_path
 
-def worker(keyword: str, proxy_port: int, output_dir: str, page_size: int, queue: Queue):
+def worker(
+    keyword: str,
+    proxy_port: int,
+    output_dir: str,
+    page_size: int,
+    output_format: str,
+    page_concurrency: int,
+    proxy_rate: float,
+    parse_workers: int,
+    pipeline_queue: int,
+    queue: Queue
+):
     try:
-        result = run_section_with_restart(keyword, proxy_port, output_dir, page_size)
+        result = run_section_with_restart(
+            keyword, proxy_port, output_dir, page_size,
+            output_format=output_format,
+            page_concurrency=page_concurrency,
+            proxy_rate=proxy_rate,
+            parse_workers=parse_workers,
+            pipeline_queue=pipeline_queue,
+        )
         queue.put(result)
     except Exception as e:
         setup_logger(keyword).exception(f"Фатальный сбой раздела: {e}")
@@ -188,6 +365,16 @@ def main():
     sections   = cfg.get("sections", [])
     output_dir = cfg.get("output_dir", "JSONs")
     page_size  = cfg.get("page_size", 100)
+    output_format = cfg.get("output_format", "ndjson")
+    page_concurrency = max(1, cfg.get("page_concurrency", 1))  # страниц раздела в полёте
+    proxy_rate = cfg.get("proxy_rate", 1.0)                    # запросов/сек на порт прокси
+    parse_workers = max(0, cfg.get("parse_workers", 0))        # процессов разбора на раздел
+    pipeline_queue = max(1, cfg.get("pipeline_queue", 8))      # страниц между стадиями
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format должен быть одним из {OUTPUT_FORMATS}")
+
+    # статусы прошлого запуска /admin/parser-status показывать не должен
+    clear_status()
 
     queue = Queue()
     processes = []
@@ -195,7 +382,8 @@ def main():
     for idx, sec in enumerate(sections):
         keyword, port = sec["keyword"], sec["proxy_port"]
         p = Process(target=worker,
-                    args=(keyword, port, output_dir, page_size, queue),
+                    args=(keyword, port, output_dir, page_size, output_format,
+                          page_concurrency, proxy_rate, parse_workers, pipeline_queue, queue),
                     name=keyword)
         p.start()
         setup_logger(keyword).info(f"Started process pid={p.pid}")
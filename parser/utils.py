@@ -1,5 +1,9 @@
+import os
+import json
 import random
+import tempfile
 import time
+from typing import Iterable
 
 def random_xff() -> str:
     """Генерирует рандомный X-Forwarded-For IP."""
@@ -8,3 +12,34 @@ def random_xff() -> str:
 def sleep_random(a: float = 2.0, b: float = 5.0) -> None:
     """Случайная пауза между запросами."""
     time.sleep(random.uniform(a, b))
+
+def write_atomic(path: str, chunks: Iterable[bytes]) -> int:
+    """
+    Пишет chunks во временный файл рядом, делает fsync и подменяет им path
+    через os.replace: читатель видит либо старое содержимое, либо новое,
+    но не половину. Возвращает число записанных кусков.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return written
+
+
+def write_json_atomic(path: str, data) -> None:
+    """JSON целиком через write_atomic."""
+    write_atomic(path, [json.dumps(data, ensure_ascii=False).encode("utf-8")])
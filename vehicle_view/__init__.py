@@ -1,8 +1,13 @@
-import re
-from pathlib import Path
+import asyncio
 
-from .fetcher import fetch_html, fetch_vehicle_ajax, fetch_detail_api
+from .fetcher import fetch_html, fetch_vehicle_ajax, fetch_detail_api, stock_id_from_url
+from .async_fetcher import (
+    fetch_html_async, fetch_vehicle_ajax_async, fetch_detail_api_async, close_async_client,
+    host_limiter,
+)
 from .parser import parse_html, collect_photos
+from .cache import ViewCache
+from .batch import view_batch
 
 def view(url: str) -> dict:
     """
@@ -11,35 +16,62 @@ def view(url: str) -> dict:
     и возвращает словарь с полной инфой по лоту.
     """
     # извлечь ID из урла, если передали полный линк
-    m = re.search(r'/VehicleDetail/(\d+)', url)
-    stock_id = m.group(1) if m else url
+    stock_id = stock_id_from_url(url)
 
-    # 1) скачать HTML
-    html_path = Path(f"/tmp/vehicle_{stock_id}.html")
-    fetch_html(stock_id, html_path)
+    # 1) скачать HTML (держим в памяти, на диск не пишем)
+    html = fetch_html(stock_id)
 
-    # 2) распарсить все поля из HTML
-    data = parse_html(html_path)
-
-    # 3) достать полную VIN-ку и базовые поля через AJAX
+    # 2) достать полную VIN-ку и базовые поля через AJAX
     try:
         ajax = fetch_vehicle_ajax(stock_id)
-        data["Full VIN"]   = ajax.get("Vin")
-        data["Make"]       = ajax.get("MakeName")
-        data["ModelName"]  = ajax.get("ModelName")
-        data["ModelYear"]  = ajax.get("ModelYear")
     except Exception:
-        # если не удалось — пропускаем
-        pass
+        ajax = None
 
-    # 4) скрытый detail-API для всех остальных полей + массива изображений
+    # 3) скрытый detail-API для всех остальных полей + массива изображений
     try:
         detail = fetch_detail_api(stock_id)
     except Exception:
         detail = {}
 
-    # 5) собрать все фотки
+    return _assemble(html, ajax, detail)
+
+async def view_async(url: str) -> dict:
+    """
+    То же, что view(), но три запроса к iaai идут одновременно
+    через общий AsyncClient, а разбор HTML — в отдельном потоке.
+    """
+    stock_id = stock_id_from_url(url)
+    html, ajax, detail = await asyncio.gather(
+        fetch_html_async(stock_id),
+        fetch_vehicle_ajax_async(stock_id),
+        fetch_detail_api_async(stock_id),
+        return_exceptions=True,
+    )
+    # без самой страницы карточки не будет; AJAX и detail-API — необязательны
+    if isinstance(html, BaseException):
+        raise html
+    if isinstance(ajax, BaseException):
+        ajax = None
+    if isinstance(detail, BaseException):
+        detail = {}
+
+    # разбор HTML — CPU-работа, не держим на ней event loop
+    return await asyncio.to_thread(_assemble, html, ajax, detail)
+
+def _assemble(html: str, ajax, detail: dict) -> dict:
+    # 1) один разбор HTML: поля, partitionKey и блок dimensions
+    data = parse_html(html)
+
+    # 2) полная VIN-ка и базовые поля из AJAX
+    if isinstance(ajax, dict):
+        data["Full VIN"]   = ajax.get("Vin")
+        data["Make"]       = ajax.get("MakeName")
+        data["ModelName"]  = ajax.get("ModelName")
+        data["ModelYear"]  = ajax.get("ModelYear")
+
+    # 3) собрать все фотки
     pk = data.pop("_partitionKey360", None)
-    data["photos"] = collect_photos(detail, pk, html_path)
+    dims = data.pop("_dimensions", None)
+    data["photos"] = collect_photos(detail, pk, dims)
 
     return data
@@ -0,0 +1,84 @@
+from typing import Optional
+
+import httpx
+
+from .fetcher import PROXY_URL, observed, random_ipv4
+from .ratelimit import HostRateLimiter
+
+# общий лимит частоты запросов к каждому хосту iaai через прокси
+host_limiter = HostRateLimiter(rate=10.0, burst=10)
+
+# Один долгоживущий клиент на процесс: соединения с прокси (и TLS до iaai)
+# переиспользуются между запросами вместо нового рукопожатия на каждый вызов
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def _throttle(request: httpx.Request):
+    await host_limiter.acquire(request.url.host)
+
+
+def _new_client() -> httpx.AsyncClient:
+    kwargs = dict(
+        event_hooks={"request": [_throttle]},
+        headers={"User-Agent": "Mozilla/5.0 (compatible; iaai-lot-parser/1.0)"},
+        proxy=PROXY_URL,
+        timeout=20.0,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    )
+    try:
+        return httpx.AsyncClient(http2=True, **kwargs)
+    except ImportError:
+        # пакет h2 не установлен — остаёмся на HTTP/1.1 с keep-alive
+        return httpx.AsyncClient(**kwargs)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+async def close_async_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@observed("html")
+async def fetch_html_async(stock_id: str) -> str:
+    """HTML страницы лота."""
+    client = get_async_client()
+    r = await client.get(
+        f"https://www.iaai.com/VehicleDetail/{stock_id}~US",
+        headers={"X-Forwarded-For": random_ipv4()},
+    )
+    r.raise_for_status()
+    return r.text
+
+
+@observed("ajax")
+async def fetch_vehicle_ajax_async(salvage_id: str) -> dict:
+    """Полный VIN и базовые поля через AJAX."""
+    client = get_async_client()
+    r = await client.get(
+        "https://vis.iaai.com/Home/GetVehicleData",
+        params={"salvageId": salvage_id},
+        headers={"X-Requested-With": "XMLHttpRequest", "X-Forwarded-For": random_ipv4()},
+    )
+    r.raise_for_status()
+    return r.json()
+
+
+@observed("detail")
+async def fetch_detail_api_async(stock_id: str) -> dict:
+    """Тайный API /api/Search/GetDetailPageData для всех полей + массива изображений."""
+    client = get_async_client()
+    r = await client.get(
+        "https://www.iaai.com/api/Search/GetDetailPageData",
+        params={"stockNumber": stock_id},
+        headers={"X-Forwarded-For": random_ipv4()},
+    )
+    r.raise_for_status()
+    return r.json()
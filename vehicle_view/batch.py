@@ -0,0 +1,38 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+from .fetcher import stock_id_from_url
+
+
+async def view_batch(
+    items: Iterable[str],
+    get: Callable[[str], Awaitable[dict]],
+    concurrency: int,
+    timeout: float,
+) -> AsyncIterator[dict]:
+    """
+    Загружает карточки для списка stock_id/ссылок, не больше concurrency
+    одновременно, и отдаёт результаты в порядке готовности — медленный лот
+    не задерживает остальные. Ошибка или таймаут лота — запись с ok=False.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(item: str) -> dict:
+        stock_id = stock_id_from_url(item)
+        async with sem:
+            try:
+                data = await asyncio.wait_for(get(stock_id), timeout)
+            except asyncio.TimeoutError:
+                return {"input": item, "stock_id": stock_id, "ok": False, "error": "timeout"}
+            except Exception as e:
+                return {"input": item, "stock_id": stock_id, "ok": False, "error": str(e)}
+        return {"input": item, "stock_id": stock_id, "ok": True, "data": data}
+
+    tasks = [asyncio.create_task(one(item)) for item in items]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        # клиент отключился посреди выдачи — не тянем оставшиеся лоты
+        for task in tasks:
+            task.cancel()
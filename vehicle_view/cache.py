@@ -0,0 +1,68 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+
+class ViewCache:
+    """
+    Кеш карточек лотов по stock_id:
+      - свежая запись (моложе ttl) отдаётся сразу;
+      - устаревшая, но моложе ttl + stale_ttl, тоже отдаётся сразу,
+        а в фоне запускается обновление (stale-while-revalidate);
+      - одновременные запросы одного stock_id ждут одну общую загрузку;
+      - записей не больше maxsize, вытесняются давно не запрошенные.
+    Ошибки загрузки не кешируются. Работает внутри одного event loop.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[dict]],
+        ttl: float = 300.0,
+        stale_ttl: float = 1800.0,
+        maxsize: int = 1000,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # stock_id → (время, данные)
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def get(self, stock_id: str) -> dict:
+        entry = self._entries.get(stock_id)
+        if entry:
+            self._entries.move_to_end(stock_id)
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self._start(stock_id)
+                return entry[1]
+
+        # shield: отмена одного ожидающего клиента не отменяет общую загрузку
+        return await asyncio.shield(self._start(stock_id))
+
+    def _start(self, stock_id: str) -> asyncio.Task:
+        task = self._inflight.get(stock_id)
+        if task is None:
+            task = asyncio.create_task(self._load(stock_id))
+            # ошибку фонового обновления некому ждать — гасим её здесь
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[stock_id] = task
+        return task
+
+    async def _load(self, stock_id: str) -> dict:
+        try:
+            data = await self.fetch(stock_id)
+        finally:
+            self._inflight.pop(stock_id, None)
+
+        self._entries[stock_id] = (time.monotonic(), data)
+        self._entries.move_to_end(stock_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        self._entries.clear()
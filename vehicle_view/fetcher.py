@@ -1,6 +1,11 @@
+import re
+import time
 import random
+import inspect
+import functools
 import httpx
-from pathlib import Path
+
+from metrics import Counter, Histogram
 
 # ——————————————————————————————————————————
 # Residential proxy settings (pl.decodo.com ports 20001–20010)
@@ -11,6 +16,57 @@ PROXY_PORT = 10000
 PROXY_URL = f"http://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}"
 # ——————————————————————————————————————————
 
+FETCH_SECONDS = Histogram(
+    "vehicle_fetch_duration_seconds",
+    "Время запроса к iaai (для async — вместе с ожиданием лимитера частоты)",
+    ["endpoint", "mode"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0),
+)
+FETCH_ERRORS = Counter(
+    "vehicle_fetch_errors",
+    "Неудачные запросы к iaai: HTTP-статус или класс исключения",
+    ["endpoint", "mode", "error"],
+)
+
+def _error_label(e: BaseException) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"http_{e.response.status_code}"
+    return type(e).__name__
+
+def observed(endpoint: str):
+    """Пишет длительность и ошибки запроса в FETCH_SECONDS / FETCH_ERRORS."""
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    FETCH_ERRORS.labels(endpoint, "async", _error_label(e)).inc()
+                    raise
+                finally:
+                    FETCH_SECONDS.labels(endpoint, "async").observe(time.perf_counter() - start)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                FETCH_ERRORS.labels(endpoint, "sync", _error_label(e)).inc()
+                raise
+            finally:
+                FETCH_SECONDS.labels(endpoint, "sync").observe(time.perf_counter() - start)
+        return run
+    return wrap
+
+def stock_id_from_url(url: str) -> str:
+    """https://www.iaai.com/VehicleDetail/43076760~US → 43076760; чистый id — как есть."""
+    m = re.search(r'/VehicleDetail/(\d+)', url)
+    return m.group(1) if m else url.strip()
+
 def random_ipv4() -> str:
     return ".".join(str(random.randint(1, 255)) for _ in range(4))
 
@@ -24,19 +80,16 @@ def get_client() -> httpx.Client:
         timeout=20.0
     )
 
-def fetch_html(stock_id: str, out_path: Path) -> str:
-    """Скачивает страницу лота и сохраняет в файл, возвращает внешний IP."""
+@observed("html")
+def fetch_html(stock_id: str) -> str:
+    """Скачивает страницу лота и возвращает HTML строкой (без записи на диск)."""
     url = f"https://www.iaai.com/VehicleDetail/{stock_id}~US"
     with get_client() as client:
-        try:
-            ip = client.get("https://api64.ipify.org?format=text").text.strip()
-        except Exception:
-            ip = "unknown"
         r = client.get(url)
         r.raise_for_status()
-        out_path.write_text(r.text, encoding="utf-8")
-    return ip
+        return r.text
 
+@observed("ajax")
 def fetch_vehicle_ajax(salvage_id: str) -> dict:
     """Получает полный VIN и базовые поля через AJAX."""
     url = f"https://vis.iaai.com/Home/GetVehicleData?salvageId={salvage_id}"
@@ -45,6 +98,7 @@ def fetch_vehicle_ajax(salvage_id: str) -> dict:
         r.raise_for_status()
         return r.json()
 
+@observed("detail")
 def fetch_detail_api(stock_id: str) -> dict:
     """Тайный API /api/Search/GetDetailPageData для всех полей + массива изображений."""
     url = "https://www.iaai.com/api/Search/GetDetailPageData"
@@ -1,37 +1,40 @@
 import re
 import json
 import urllib.parse
-from pathlib import Path
+from typing import Optional
 from bs4 import BeautifulSoup
 
-def parse_html(path: Path) -> dict:
+PARTITION_KEY_RE = re.compile(r"partitionKey\s*:\s*'(\d+)'")
+DIMENSIONS_RE = re.compile(r"JSON\.parse\('(.+?)'\)", re.S)
+
+LABELS = (
+    "Stock #", "Selling Branch", "VIN (Status)", "Loss", "Primary Damage",
+    "Title/Sale Doc", "Start Code", "Key", "Odometer", "Airbags",
+    "Vehicle", "Body Style", "Engine", "Transmission",
+    "Drive Line Type", "Fuel Type", "Cylinders", "Restraint System",
+    "Exterior/Interior", "Options", "Manufactured In",
+    "Vehicle Class", "Model",
+    "Vehicle Location", "Auction Date and Time", "Lane/Run #",
+    "Aisle/Stall", "Actual Cash Value", "Estimated Repair Cost", "Seller",
+)
+
+def label_values(soup: BeautifulSoup) -> dict:
     """
-    Вытаскивает из vehicle.html все текстовые поля по лейблам
-    data-list__label → data-list__value, аукционную дату и Start Code.
+    Значения полей карточки по LABELS. Один проход по span.data-list__label
+    строит словарь "Label" → первый такой span, дальше поля берутся из него,
+    а get_text вызывается только у нужных data-list__value.
     """
-    soup = BeautifulSoup(path.read_text("utf-8"), "html.parser")
     result = {}
 
-    labels = [
-        "Stock #", "Selling Branch", "VIN (Status)", "Loss", "Primary Damage",
-        "Title/Sale Doc", "Start Code", "Key", "Odometer", "Airbags",
-        "Vehicle", "Body Style", "Engine", "Transmission",
-        "Drive Line Type", "Fuel Type", "Cylinders", "Restraint System",
-        "Exterior/Interior", "Options", "Manufactured In",
-        "Vehicle Class", "Model",
-        "Vehicle Location", "Auction Date and Time", "Lane/Run #",
-        "Aisle/Stall", "Actual Cash Value", "Estimated Repair Cost", "Seller",
-    ]
-
-    for label in labels:
-        # найти точный <span class="data-list__label">Label:</span>
-        lbl = soup.find(
-            lambda t:
-                t.name == "span"
-                and t.get("class") and "data-list__label" in t.get("class")
-                and t.get_text(strip=True).startswith(f"{label}:")
-        )
-        if not lbl:
+    label_spans = {}
+    for span in soup.find_all("span", class_="data-list__label"):
+        name, colon, _ = span.get_text(strip=True).partition(":")
+        if colon:
+            label_spans.setdefault(name, span)
+
+    for label in LABELS:
+        lbl = label_spans.get(label)
+        if lbl is None:
             result[label] = None
             continue
 
@@ -48,6 +51,19 @@ def parse_html(path: Path) -> dict:
 
         result[label] = val
 
+    return result
+
+def parse_html(html: str) -> dict:
+    """
+    Вытаскивает из HTML карточки (строка ответа, без записи на диск)
+    все текстовые поля по лейблам data-list__label → data-list__value,
+    аукционную дату и Start Code. Документ разбирается один раз: из тех же
+    <script> берутся partitionKey для 360° и блок dimensions (JSON.parse('…')),
+    они возвращаются в служебных полях _partitionKey360 и _dimensions.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    result = label_values(soup)
+
     # если Start Code так и не нашли — смотрим в скрытых input/span
     if result.get("Start Code") is None:
         nov = soup.find("span", id="startcodeengine_novideo")
@@ -57,30 +73,41 @@ def parse_html(path: Path) -> dict:
         elif hid and hid.get("value"):
             result["Start Code"] = hid["value"]
 
-    # тянем partitionKey для 360°
+    # тянем partitionKey для 360° и блок dimensions за один проход по скриптам
     pk = None
+    dims_raw = None
     for sc in soup.find_all("script"):
         txt = sc.string or ""
-        m = re.search(r"partitionKey\s*:\s*'(\d+)'", txt)
-        if m:
-            pk = m.group(1)
+        if pk is None:
+            m = PARTITION_KEY_RE.search(txt)
+            if m:
+                pk = m.group(1)
+        if dims_raw is None:
+            m = DIMENSIONS_RE.search(txt)
+            if m:
+                dims_raw = m.group(1)
+        if pk is not None and dims_raw is not None:
             break
     result["_partitionKey360"] = pk
 
+    dims = None
+    if dims_raw is not None:
+        try:
+            dims = json.loads(dims_raw)
+        except json.JSONDecodeError:
+            dims = None
+    result["_dimensions"] = dims
+
     return result
 
-def extract_photos_from_dimensions(html_path: Path) -> list[str]:
+def extract_photos_from_dimensions(dims: Optional[dict]) -> list[str]:
     """
-    В JSON.parse('…') ищет блок dimensions.keys и генерирует по каждому
-    ключу ссылку через resizer с width=1000&height=300.
+    По блоку dimensions (из parse_html → _dimensions) генерирует по каждому
+    ключу dimensions.keys ссылку через resizer с width=1000&height=300.
     Плюс до 20 360°-картинок.
     """
-    text = html_path.read_text("utf-8")
-    soup = BeautifulSoup(text, "html.parser")
-    m = re.search(r"JSON\.parse\('(.+?)'\)", text, re.S)
-    if not m:
+    if not dims:
         return []
-    dims = json.loads(m.group(1))
     host = "https://vis.iaai.com"
     photos = []
     for e in dims.get("keys", []):
@@ -104,7 +131,7 @@ def extract_photos_from_dimensions(html_path: Path) -> list[str]:
 
     return list(dict.fromkeys(photos))
 
-def collect_photos(detail_json: dict, partition_key: str, html_path: Path) -> list[str]:
+def collect_photos(detail_json: dict, partition_key: str, dims: Optional[dict]) -> list[str]:
     """
     Собирает:
       1) все URL из detail_json["Images"] / ["BusinessImages"]
@@ -125,5 +152,5 @@ def collect_photos(detail_json: dict, partition_key: str, html_path: Path) -> li
                 f"?tenant=iaai&partitionKey={partition_key}&imageOrder={i}"
             )
 
-    photos.extend(extract_photos_from_dimensions(html_path))
+    photos.extend(extract_photos_from_dimensions(dims))
     return list(dict.fromkeys(photos))
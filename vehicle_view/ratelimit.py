@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket: в среднем rate запросов в секунду, всплеск до burst.
+    Рассчитан на один event loop — между проверкой и списанием токена нет await.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """Отдельный TokenBucket на каждый хост (www.iaai.com, vis.iaai.com, …)."""
+
+    def __init__(self, rate: float = 10.0, burst: int = 10):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def configure(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets.clear()
+
+    async def acquire(self, host: str):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()